@@ -0,0 +1,104 @@
+import os
+import gzip
+import hashlib
+
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+from config import Config
+from state import State
+
+
+AUTOSAVE_DIR = Path("autosaves/").resolve()
+AUTOSAVE_TIME_FORMAT = "%Y%m%d-%H%M%S"
+
+
+@dataclass
+class AutosaveEntry:
+    path: Path
+    time: datetime
+    digest: str
+
+
+class AutosaveStore:
+    """
+    Compressed autosaves of a config's inventory, identical snapshots are skipped and old ones are pruned:
+    the last ``keep_last`` autosaves are kept, then the latest one of each hour and of each day
+    """
+
+    def __init__(self, config: Config, keep_last: int = 10, keep_hourly: int = 24, keep_daily: int = 30):
+        self.config = config
+        self.keep_last = keep_last
+        self.keep_hourly = keep_hourly
+        self.keep_daily = keep_daily
+        # the inventories of a config have their own autosaves, a state only applies to its inventory
+        self.folder = AUTOSAVE_DIR / f"{self.config.fingerprint[:16]}_{self.config.active_inv.index}"
+
+    def get_entries(self):
+        """Returns the autosaves sorted from the newest to the oldest, only the filenames are read"""
+
+        entries: list[AutosaveEntry] = []
+
+        if self.folder.exists():
+            for path in self.folder.glob("autosave_*.json.gz"):
+                # format: autosave_DATE-TIME_HASH.json.gz
+                _, date, digest = path.name.removesuffix(".json.gz").split("_")
+                entries.append(AutosaveEntry(path, datetime.strptime(date, AUTOSAVE_TIME_FORMAT), digest))
+
+        entries.sort(key=lambda entry: entry.time, reverse=True)
+        return entries
+
+    def add(self, state: State):
+        """Stores the state captured from the labels, returns None if it's the same as the latest autosave"""
+
+        data = state.to_json()
+        digest = hashlib.sha256(data.encode()).hexdigest()[:16]
+        entries = self.get_entries()
+
+        if len(entries) > 0 and entries[0].digest == digest:
+            return None
+
+        if not self.folder.exists():
+            self.folder.mkdir(parents=True, exist_ok=True)
+
+        now = datetime.now()
+        path = self.folder / f"autosave_{now.strftime(AUTOSAVE_TIME_FORMAT)}_{digest}.json.gz"
+        temp_path = path.with_name(f"{path.name}.tmp")
+
+        with temp_path.open("wb") as file:
+            file.write(gzip.compress(data.encode()))
+            file.flush()
+            os.fsync(file.fileno())
+
+        os.replace(temp_path, path)
+
+        entry = AutosaveEntry(path, now, digest)
+        self.prune([entry] + entries)
+        return entry
+
+    def prune(self, entries: list[AutosaveEntry]):
+        keep = set(entry.path for entry in entries[: self.keep_last])
+
+        for time_format, limit in [("%Y%m%d%H", self.keep_hourly), ("%Y%m%d", self.keep_daily)]:
+            buckets: set[str] = set()
+
+            for entry in entries:
+                bucket = entry.time.strftime(time_format)
+
+                if bucket not in buckets:
+                    if len(buckets) == limit:
+                        break
+
+                    buckets.add(bucket)
+                    keep.add(entry.path)
+
+        for entry in entries:
+            if entry.path not in keep:
+                entry.path.unlink(missing_ok=True)
+
+    def load(self, entry: AutosaveEntry, state: State):
+        """Returns False if the autosave can't be applied to the tracker"""
+
+        with entry.path.open("rb") as file:
+            return state.get_states_from_json(gzip.decompress(file.read()).decode())
@@ -0,0 +1,162 @@
+import time
+
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from PyQt6.QtCore import Qt, QObject, QTimer
+
+from state import Action, ActionKind
+from profiler import profiled
+
+
+# the input of a frame is performed at once
+FRAME_INTERVAL = 16  # milliseconds
+
+# the actions whose steps can be added, the labels compute the result of several steps at once
+COALESCED_KINDS = [ActionKind.TOGGLE, ActionKind.PROGRESSIVE, ActionKind.COUNTER]
+
+
+@dataclass
+class PendingAction:
+    action: Action
+    inputs: int  # number of clicks and wheel events merged into the action
+    first_input: float
+    input_times: float  # sum of the times of these inputs, to compute their latency
+
+
+class InputCoalescer(QObject):
+    """
+    Performs the actions of the labels' input (clicks and wheel) with ``perform``, at most once per frame per item:
+    the first input after an idle frame is performed right away, the input that arrives during the next frame waits
+    until the end of the frame. The steps of an item in the same direction are added into a single action
+    so a fast wheel or rapid clicks update and render the item's label once per frame.
+    The actions are performed in the order of their first input, ``flush`` performs the waiting ones immediately.
+    """
+
+    def __init__(self, parent: Optional[QObject], perform: Callable[[Action], None], interval: int = FRAME_INTERVAL):
+        super().__init__(parent)
+
+        self.perform = perform
+        self.pending: list[PendingAction] = []
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.timer.setInterval(interval)
+        self.timer.timeout.connect(self.timer_timeout)
+
+        # statistics, latencies in milliseconds
+        self.inputs = 0
+        self.performed = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.max_per_second = 0
+        self.recent: deque[float] = deque()  # times of the actions performed during the last second
+
+    def add(self, action: Action):
+        now = time.perf_counter()
+        self.inputs += 1
+
+        if not self.timer.isActive():
+            # nothing happened during the last frame
+            self.perform_pending(PendingAction(action, 1, now, now))
+            self.timer.start()
+            return
+
+        # the actions of different items don't depend on each other, only the last one of this item can be merged
+        for pending in reversed(self.pending):
+            if self.is_same_item(pending.action, action):
+                if pending.action.pos_index == action.pos_index and self.can_merge(pending.action, action):
+                    if action.kind == ActionKind.TOGGLE:
+                        # a toggle is its own inverse, only the parity of its steps matters
+                        steps = self.get_delta(pending.action) + self.get_delta(action)
+                        pending.action.increase = steps >= 0
+                        pending.action.steps = abs(steps) % 2
+                    else:
+                        pending.action.steps += action.steps
+
+                    pending.inputs += 1
+                    pending.input_times += now
+                    return
+
+                break
+
+        self.pending.append(PendingAction(action, 1, now, now))
+
+    @staticmethod
+    def is_same_item(pending: Action, action: Action):
+        if pending.index != action.index:
+            return False
+
+        # the positions of an item share its counter
+        if ActionKind.COUNTER in (pending.kind, action.kind):
+            return True
+
+        return pending.pos_index == action.pos_index
+
+    @staticmethod
+    def can_merge(pending: Action, action: Action):
+        # the steps of a direction can be added, but opposite steps don't always cancel each other out
+        # (for instance a counter whose value isn't a multiple of its increment)
+        return (
+            pending.kind == action.kind
+            and pending.kind in COALESCED_KINDS
+            and (pending.kind == ActionKind.TOGGLE or pending.increase == action.increase)
+            and not pending.middle_click
+            and not action.middle_click
+        )
+
+    @staticmethod
+    def get_delta(action: Action):
+        return action.steps if action.increase else -action.steps
+
+    def is_pending(self):
+        return len(self.pending) > 0
+
+    @profiled
+    def flush(self):
+        """Performs the waiting actions now, for instance before undoing or saving"""
+
+        pending_actions = self.pending
+        self.pending = []
+
+        for pending in pending_actions:
+            self.perform_pending(pending)
+
+    def perform_pending(self, pending: PendingAction):
+        # the steps that cancel each other out aren't an action
+        if pending.action.steps > 0:
+            self.perform(pending.action)
+            self.performed += 1
+
+        end = time.perf_counter()
+        self.total_latency += (pending.inputs * end - pending.input_times) * 1000
+        self.max_latency = max(self.max_latency, (end - pending.first_input) * 1000)
+
+        if pending.action.steps > 0:
+            self.recent.append(end)
+
+            while self.recent[0] < end - 1.0:
+                self.recent.popleft()
+
+            self.max_per_second = max(self.max_per_second, len(self.recent))
+
+    def timer_timeout(self):
+        if self.is_pending():
+            self.flush()
+            # the next input waits for the end of this frame too
+            self.timer.start()
+
+    def get_report(self):
+        mean_latency = self.total_latency / self.inputs if self.inputs > 0 else 0.0
+
+        return "\n".join(
+            [
+                f"Frame: {self.timer.interval()} ms",
+                f"Inputs (clicks and wheel events): {self.inputs}",
+                f"Actions performed: {self.performed} ({self.inputs - self.performed} inputs merged or cancelled)",
+                f"Input latency (until performed): {mean_latency:.2f} ms, longest {self.max_latency:.2f} ms",
+                f"Most actions performed in one second: {self.max_per_second}",
+            ]
+        )
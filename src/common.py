@@ -1,10 +1,22 @@
 import math
 
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional, TYPE_CHECKING
-
-from PyQt6.QtCore import pyqtSignal, Qt, QSize, QPoint, QRect, QAbstractListModel, QThread
-from PyQt6.QtWidgets import QLabel, QWidget, QGraphicsColorizeEffect, QMessageBox
+from typing import Any, Optional, TYPE_CHECKING
+
+from PyQt6.QtCore import pyqtSignal, Qt, QSize, QPoint, QRect, QAbstractListModel, QThread, QObject
+from PyQt6.QtWidgets import (
+    QLabel,
+    QWidget,
+    QGraphicsColorizeEffect,
+    QMessageBox,
+    QDialog,
+    QDialogButtonBox,
+    QListWidget,
+    QListWidgetItem,
+    QPlainTextEdit,
+    QVBoxLayout,
+)
 from PyQt6.QtGui import (
     QMouseEvent,
     QPixmap,
@@ -18,11 +30,23 @@ from PyQt6.QtGui import (
     QTransform,
 )
 
+from profiler import profiled
+
 if TYPE_CHECKING:
-    from config import Config
+    from config import Config, InventoryItem
 
 
 GLOBAL_HALF_OPACITY = 0.6
+WHEEL_NOTCH = 120  # angle delta of a notch of the wheel, in eighths of a degree
+
+
+@dataclass(frozen=True)
+class LabelId:
+    """Identifies an inventory item's position, shared by the item's label and its overlays"""
+
+    inventory: int
+    item: int
+    pos: int
 
 
 class ListViewModel(QAbstractListModel):
@@ -44,6 +68,101 @@ class ListViewModel(QAbstractListModel):
         return len(self.items)
 
 
+class ListDialog(QDialog):
+    """Lists entries by their text, the data of the selected entry is available in ``data`` once accepted"""
+
+    def __init__(self, parent: Optional[QWidget], title: str, entries: list[tuple[str, Any]]):
+        super().__init__(parent)
+
+        self.data: Any = None
+
+        self.setWindowTitle(title)
+        self.resize(300, 350)
+
+        self.list_entries = QListWidget(self)
+        self.list_entries.setObjectName("list_entries")
+
+        for text, data in entries:
+            list_item = QListWidgetItem(text)
+            list_item.setData(Qt.ItemDataRole.UserRole, data)
+            self.list_entries.addItem(list_item)
+
+        self.list_entries.setCurrentRow(0)
+        self.list_entries.itemDoubleClicked.connect(self.accept)
+
+        self.buttons = QDialogButtonBox(
+            QDialogButtonBox.StandardButton.Open | QDialogButtonBox.StandardButton.Cancel, parent=self
+        )
+        self.buttons.accepted.connect(self.accept)
+        self.buttons.rejected.connect(self.reject)
+
+        layout = QVBoxLayout(self)
+        layout.addWidget(self.list_entries)
+        layout.addWidget(self.buttons)
+
+    def accept(self):
+        list_item = self.list_entries.currentItem()
+
+        if list_item is not None:
+            self.data = list_item.data(Qt.ItemDataRole.UserRole)
+
+        super().accept()
+
+    @staticmethod
+    def get_data(parent: Optional[QWidget], title: str, entries: list[tuple[str, Any]]):
+        """Shows the dialog and returns the data of the selected entry, or None if it was cancelled"""
+
+        dialog = ListDialog(parent, title, entries)
+
+        if dialog.exec() == QDialog.DialogCode.Accepted:
+            return dialog.data
+
+        return None
+
+
+class TextDialog(QDialog):
+    """Shows a read-only text, for reports"""
+
+    def __init__(self, parent: Optional[QWidget], title: str, text: str):
+        super().__init__(parent)
+
+        self.setWindowTitle(title)
+        self.resize(700, 500)
+
+        self.text_report = QPlainTextEdit(self)
+        self.text_report.setObjectName("text_report")
+        self.text_report.setReadOnly(True)
+        self.text_report.setLineWrapMode(QPlainTextEdit.LineWrapMode.NoWrap)
+        self.text_report.setPlainText(text)
+
+        self.buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Close, parent=self)
+        self.buttons.rejected.connect(self.reject)
+
+        layout = QVBoxLayout(self)
+        layout.addWidget(self.text_report)
+        layout.addWidget(self.buttons)
+
+
+class LabelDispatcher(QObject):
+    """
+    Routes the clicks and the wheel of every label of a tracker to the window with a single connection per signal,
+    the labels send themselves and the window finds the item they belong to with their ``LabelId``
+    """
+
+    clicked_left = pyqtSignal(object)
+    clicked_middle = pyqtSignal(object)
+    clicked_right = pyqtSignal(object)
+    scrolled = pyqtSignal(object, int)  # number of steps, negative to decrease
+
+    def click(self, label: QLabel, button: Qt.MouseButton):
+        if button == Qt.MouseButton.LeftButton:
+            self.clicked_left.emit(label)
+        elif button == Qt.MouseButton.MiddleButton:
+            self.clicked_middle.emit(label)
+        else:
+            self.clicked_right.emit(label)
+
+
 # from https://stackoverflow.com/a/64291055
 class OutlinedLabel(QLabel):
     clicked = pyqtSignal()
@@ -51,17 +170,19 @@ class OutlinedLabel(QLabel):
     clicked_middle = pyqtSignal()
     clicked_right = pyqtSignal()
 
-    def __init__(self, config: "Config", parent: Optional[QWidget]):
-        super().__init__()
+    def __init__(self, config: "Config", parent: Optional[QWidget], dispatcher: Optional[LabelDispatcher] = None):
+        super().__init__(parent)
         self.w = 1 / 25
         self.mode = True
         self.setBrush(Qt.GlobalColor.white)
         self.setPen(Qt.GlobalColor.black)
-        self.setParent(parent)
         self.config = config
+        self.dispatcher = dispatcher
 
         self.reward_index = 0
         self.item_label: Optional["Label"] = None
+        self.label_id: Optional[LabelId] = None
+        self.text_style: Optional[tuple[int, bool]] = None
 
     @staticmethod
     def new(
@@ -71,8 +192,11 @@ class OutlinedLabel(QLabel):
         geometry: QRect,
         text: str,
         text_settings_index: int,
+        label_id: Optional[LabelId] = None,
+        dispatcher: Optional[LabelDispatcher] = None,
     ):
-        new_label = OutlinedLabel(config, parent)
+        new_label = OutlinedLabel(config, parent, dispatcher)
+        new_label.label_id = label_id
         new_label.setObjectName(obj_name)
         new_label.setGeometry(geometry)
         new_label.setText(text)
@@ -96,19 +220,16 @@ class OutlinedLabel(QLabel):
                     else:
                         self.clicked_right.emit()
 
+                    if self.dispatcher is not None:
+                        self.dispatcher.click(self, e.button())
+
     def wheelEvent(self, e: Optional[QWheelEvent]):
         super(QLabel, self).wheelEvent(e)
 
         if e is not None:
             item = self.config.active_inv.items[self.item_label.index]
             if item.use_wheel:
-                # adapted from https://stackoverflow.com/a/20152809
-                value = 0
-                steps = e.angleDelta().y() // 120
-                for _ in range(1, abs(steps) + 1):
-                    value += steps and steps // abs(steps)  # 0, 1, or -1
-                    if value != 0:
-                        self.item_label.update_label(value > 0, False)
+                self.item_label.scroll(e.angleDelta().y())
 
     def scaledOutlineMode(self):
         return self.mode
@@ -141,6 +262,7 @@ class OutlinedLabel(QLabel):
         w = math.ceil(self.outlineThickness() * 2)
         return super().minimumSizeHint() + QSize(w, w)
 
+    @profiled
     def paintEvent(self, event):
         if self.text() == "":
             return
@@ -182,6 +304,11 @@ class OutlinedLabel(QLabel):
         qp.fillPath(path, self.brush)
 
     def set_text_style(self, text_settings_index: int, is_max: bool):
+        # setting the same stylesheet again still makes Qt recompute the style
+        if self.text_style == (text_settings_index, is_max):
+            return
+
+        self.text_style = (text_settings_index, is_max)
         text_settings = self.config.get_text_settings(text_settings_index)
         font = self.config.get_font(text_settings)
         color = self.config.get_color(text_settings, is_max)
@@ -204,20 +331,32 @@ class Label(QLabel):
     clicked_left = pyqtSignal()
     clicked_middle = pyqtSignal()
     clicked_right = pyqtSignal()
+    scrolled = pyqtSignal(int)
 
-    def __init__(self, config: "Config", parent: Optional[QWidget], index: int, name: str):
-        super(QLabel, self).__init__()
+    def __init__(
+        self,
+        config: "Config",
+        parent: Optional[QWidget],
+        index: int,
+        name: str,
+        dispatcher: Optional[LabelDispatcher] = None,
+    ):
+        super().__init__(parent)
 
         self.config = config
-        self.setParent(parent)
+        self.dispatcher = dispatcher
         self.index = index
         self.name = name
         self.img_index = -1
         self.flag_text_index = 0
         self.reward_index = 0
+        self.wheel_delta = 0
+        self.label_id: Optional[LabelId] = None
         self.original_pixmap: Optional[QPixmap] = None
-        self.label_counter: Optional[OutlinedLabel] = None
         self.label_effect: Optional[QGraphicsColorizeEffect] = None
+
+        # the overlays are created the first time they're shown (see ``get_counter``, ``get_flag``, ``get_extra_img``)
+        self.label_counter: Optional[OutlinedLabel] = None
         self.label_flag: Optional[OutlinedLabel] = None
         self.label_extra_img: Optional["Label"] = None
 
@@ -233,12 +372,15 @@ class Label(QLabel):
         opacity: float,
         scale_content: bool,
         default_strength: float,
+        label_id: Optional[LabelId] = None,
+        dispatcher: Optional[LabelDispatcher] = None,
     ):
-        new_label = Label(config, parent, index, name)
+        new_label = Label(config, parent, index, name, dispatcher)
+        new_label.label_id = label_id
         new_label.setObjectName(obj_name)
         new_label.setGeometry(geometry)
         new_label.setText("")
-        new_label.original_pixmap = QPixmap(img_path)
+        new_label.original_pixmap = config.get_pixmap(Path(img_path))
         new_label.setPixmap(new_label.original_pixmap)
         new_label.set_pixmap_opacity(opacity)
         new_label.setScaledContents(scale_content)
@@ -254,6 +396,102 @@ class Label(QLabel):
 
         return new_label
 
+    def get_item(self) -> "InventoryItem":
+        return self.config.inventories[self.label_id.inventory].items[self.label_id.item]
+
+    def has_counter(self):
+        return self.get_item().counter is not None
+
+    def has_flag(self):
+        return len(self.config.flags) > 0 and self.get_item().flag_index is not None
+
+    def has_extra_img(self):
+        return self.get_item().extra_index is not None
+
+    def scroll(self, angle_delta: int):
+        """
+        Sends the notches of the wheel as a single number of steps (negative to decrease),
+        the small deltas of high resolution wheels and touchpads add up until they make a notch
+        """
+
+        self.wheel_delta += angle_delta
+        steps = int(self.wheel_delta / WHEEL_NOTCH)
+        self.wheel_delta -= steps * WHEEL_NOTCH
+
+        if steps != 0:
+            self.scrolled.emit(steps)
+
+            if self.dispatcher is not None:
+                self.dispatcher.scrolled.emit(self, steps)
+
+    def get_counter(self):
+        """Returns the label showing the counter's value, created and shown the first time"""
+
+        if self.label_counter is None:
+            counter = self.get_item().counter
+            self.label_counter = OutlinedLabel.new(
+                self.parentWidget(),
+                self.config,
+                f"{self.objectName()}_counter",
+                QRect(self.x() + counter.pos.x, self.y() + counter.pos.y, counter.width, counter.height),
+                "",
+                counter.text_settings_index,
+                self.label_id,
+                self.dispatcher,
+            )
+            self.label_counter.item_label = self
+            self.label_counter.show()
+
+        return self.label_counter
+
+    def get_flag(self):
+        """Returns the flag's label with the current text, created hidden the first time"""
+
+        if self.label_flag is None:
+            item = self.get_item()
+            flag = self.config.flags[item.flag_index]
+            self.label_flag = OutlinedLabel.new(
+                self.parentWidget(),
+                self.config,
+                f"{self.objectName()}_flag",
+                QRect(self.x() + flag.pos.x, self.y() + flag.pos.y, flag.width, flag.height),
+                flag.texts[self.flag_text_index],
+                flag.text_settings_index,
+                self.label_id,
+                self.dispatcher,
+            )
+            self.label_flag.set_text_style(
+                flag.text_settings_index, not item.is_reward and self.flag_text_index == len(flag.texts) - 1
+            )
+            self.label_flag.item_label = self
+            self.label_flag.setVisible(False)
+
+        return self.label_flag
+
+    def get_extra_img(self):
+        """Returns the label of the extra image, created hidden the first time"""
+
+        if self.label_extra_img is None:
+            extra = self.config.extras.items[self.get_item().extra_index]
+            width, height = self.config.get_image_size(extra.path)
+            self.label_extra_img = Label.new(
+                self.config,
+                self.parentWidget(),
+                self.index,
+                self.name,
+                f"{self.objectName()}_extra_img",
+                QRect(self.x() + extra.pos.x, self.y() + extra.pos.y, width, height),
+                str(extra.path),
+                1.0,
+                False,
+                0.0,
+                self.label_id,
+                self.dispatcher,
+            )
+            self.label_extra_img.setVisible(False)
+
+        return self.label_extra_img
+
     def mousePressEvent(self, e: Optional[QMouseEvent]):
         super(QLabel, self).mousePressEvent(e)
 
@@ -269,19 +507,16 @@ class Label(QLabel):
                     else:
                         self.clicked_right.emit()
 
+                    if self.dispatcher is not None:
+                        self.dispatcher.click(self, e.button())
+
     def wheelEvent(self, e: Optional[QWheelEvent]):
         super(QLabel, self).wheelEvent(e)
 
         if e is not None:
             item = self.config.active_inv.items[self.index]
             if item.use_wheel:
-                # adapted from https://stackoverflow.com/a/20152809
-                value = 0
-                steps = e.angleDelta().y() // 120
-                for _ in range(1, abs(steps) + 1):
-                    value += steps and steps // abs(steps)  # 0, 1, or -1
-                    if value != 0:
-                        self.update_label(value > 0, False)
+                self.scroll(e.angleDelta().y())
 
     def set_pixmap_opacity(self, opacity: float):
         pixmap = self.pixmap().copy()
@@ -306,63 +541,52 @@ class Label(QLabel):
                 self.set_pixmap_opacity(0.0 if gomode_settings.hide_if_disabled else GLOBAL_HALF_OPACITY)
 
         if gomode_visibility is None:
-            self.config.label_gomode_light.setVisible(not self.config.label_gomode_light.isVisible())
+            self.config.label_gomode_light.setVisible(self.config.label_gomode_light.isHidden())
+
+    @profiled
+    def update_label(self, increase: bool, middle_click: bool = False, steps: int = 1):
+        """Updates the item ``steps`` times in a row (see ``InputCoalescer``), the label is rendered once"""
 
-    def update_label(self, increase: bool, middle_click: bool = False):
         if self.label_effect is not None:
             item = self.config.active_inv.items[self.index]
+            delta = steps if increase else -steps
             path_index = 0
 
             if not middle_click and len(item.paths) > 1:
-                if increase:
-                    self.img_index += 1
-                    self.flag_text_index += 1
-                else:
-                    self.img_index -= 1
-                    self.flag_text_index -= 1
+                # the images cycle from disabled (-1) to the last one
+                self.img_index = (self.img_index + 1 + delta) % (len(item.paths) + 1) - 1
+                self.flag_text_index += delta
 
-                if self.label_flag is not None and item.flag_index is not None:
+                if self.has_flag():
                     flag = self.config.flags[item.flag_index]
                     total = len(flag.texts) - 1
+                    self.flag_text_index %= total + 1
 
-                    if self.flag_text_index > total:
-                        self.flag_text_index = 0
-                    if self.flag_text_index < 0:
-                        self.flag_text_index = total
-
-                    self.label_flag.setText(flag.texts[self.flag_text_index])
-                    self.label_flag.set_text_style(flag.text_settings_index, self.flag_text_index == total)
-
-                if self.img_index > len(item.paths) - 1:
-                    self.img_index = -1
-                if self.img_index < -1:
-                    self.img_index = len(item.paths) - 1
+                    # a flag that was never shown gets its text when it's created
+                    if self.label_flag is not None:
+                        self.label_flag.setText(flag.texts[self.flag_text_index])
+                        self.label_flag.set_text_style(flag.text_settings_index, self.flag_text_index == total)
 
                 if self.img_index < 0:
                     self.label_effect.setStrength(1.0)  # enable filter
-                    self.set_pixmap_opacity(GLOBAL_HALF_OPACITY)
                     path_index = 0
                 else:
                     self.label_effect.setStrength(0.0)  # disable filter
-                    self.setPixmap(self.original_pixmap)
                     path_index = self.img_index
 
-                self.original_pixmap = QPixmap(str(item.paths[path_index]))
-                self.setPixmap(self.original_pixmap)
+                self.original_pixmap = self.config.get_pixmap(item.paths[path_index])
 
                 if self.img_index < 0:
+                    self.setPixmap(self.original_pixmap)
                     self.set_pixmap_opacity(GLOBAL_HALF_OPACITY)
                 else:
                     self.setPixmap(self.original_pixmap)
-            elif self.label_counter is not None:
-                if increase:
-                    item.counter.incr(middle_click)
-                else:
-                    item.counter.decr()
+            elif item.counter is not None:
+                item.counter.step(delta, middle_click)
 
                 if self.label_effect is not None:
                     item.counter.update(self)
-            else:
+            elif steps % 2 == 1:
                 if self.label_effect is not None:
                     if self.label_effect.strength() > 0.0:
                         self.label_effect.setStrength(0.0)
@@ -377,8 +601,8 @@ class RotationWidget(QWidget):
     position = 0
     rotation = 0
 
-    def __init__(self, image):
-        super().__init__()
+    def __init__(self, image, parent: Optional[QWidget] = None):
+        super().__init__(parent)
         self.image = QPixmap(image)
         self.setFixedSize(self.image.size())
         self.transform = QTransform()
@@ -391,12 +615,11 @@ class RotationWidget(QWidget):
         parent: QWidget,
         obj_name: str,
         geometry: QRect,
-        img_path: str,
+        img_path: str | QPixmap,
     ):
-        new_label = RotationWidget(img_path)
+        new_label = RotationWidget(img_path, parent)
         new_label.setObjectName(obj_name)
         new_label.setGeometry(geometry)
-        new_label.setParent(parent)
 
         return new_label
 
@@ -432,7 +655,7 @@ class Rotation(QThread):
         self.thread_refresh = self.config.gomode_settings.thread_refresh_rate
 
     def run(self):
-        while True:
+        while not self.isInterruptionRequested():
             diff = self.thread_refresh * self.speed
             self.position = round((self.position + diff) % 360, 2)
             self.positionChanged.emit(self.position)
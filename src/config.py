@@ -1,13 +1,19 @@
+import os
+import hashlib
+
 from xml.etree import ElementTree as ET
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
+from copy import copy
 from typing import Optional
 from pathlib import Path
 
-from PyQt6.QtGui import QFontDatabase, QPixmap
+from PIL import Image
+from PyQt6.QtGui import QFontDatabase, QPixmap, QImage
 from PyQt6.QtWidgets import QWidget
 from PyQt6.QtCore import QRect
 
-from common import OutlinedLabel, Label, RotationWidget, show_error, GLOBAL_HALF_OPACITY
+from common import OutlinedLabel, Label, LabelId, RotationWidget, show_error, GLOBAL_HALF_OPACITY
+from profiler import PROFILER, profiled
 
 
 class Color:
@@ -24,6 +30,9 @@ class Color:
     def pack(color: "Color"):
         return ((color.r & 0xFF) << 16) | ((color.g & 0xFF) << 8) | (color.b & 0xFF)
 
+    def __eq__(self, other: object):
+        return isinstance(other, Color) and Color.pack(self) == Color.pack(other)
+
 
 @dataclass
 class Pos:
@@ -96,16 +105,54 @@ class Counter:
             self.value = self.max
             self.show = True
 
+    def step(self, steps: int, middle_click: bool = False):
+        """Same as ``incr`` (``steps`` > 0) or ``decr`` (``steps`` < 0) called ``abs(steps)`` times"""
+
+        span = self.max - self.min
+        offset = self.value - self.min
+
+        # without a regular cycle (a value that isn't min plus a multiple of the increment), one step at a time
+        if (
+            middle_click
+            or self.increment <= 0
+            or span < 0
+            or span % self.increment != 0
+            or (self.show and (offset < 0 or offset > span or offset % self.increment != 0))
+        ):
+            for _ in range(abs(steps)):
+                if steps > 0:
+                    self.incr(middle_click)
+                else:
+                    self.decr()
+
+            return
+
+        # the counter cycles through the hidden position then every value from min to max
+        positions = span // self.increment + 2
+        position = offset // self.increment + 1 if self.show else 0
+        position = (position + steps) % positions
+
+        if position > 0:
+            self.value = self.min + (position - 1) * self.increment
+            self.show = True
+        elif steps != 0:
+            # the value past the bound, as ``incr`` and ``decr`` leave it
+            self.value = self.max + self.increment if steps > 0 else self.min - self.increment
+            self.show = False
+
+    @profiled
     def update(self, label: Label):
         if self.show:
             label.label_effect.setStrength(0.0)  # disable filter
             label.setPixmap(label.original_pixmap)
-            label.label_counter.setText(f"{self.value}")
+            label.get_counter().setText(f"{self.value}")
             label.label_counter.set_text_style(self.text_settings_index, self.value == self.max)
         else:
             label.label_effect.setStrength(1.0)  # enable filter
             label.set_pixmap_opacity(GLOBAL_HALF_OPACITY)
-            label.label_counter.setText("")
+
+            if label.label_counter is not None:
+                label.label_counter.setText("")
 
 
 @dataclass
@@ -132,10 +179,11 @@ class InventoryItem:
     extra_index: Optional[int]
     reward_map: dict[int, OutlinedLabel]
 
-    def update_reward(self, index: int, reward_info: RewardItem):
-        item_geo = self.reward_map[index].item_label.geometry()
-        self.reward_map[index].setText(reward_info.name)
-        self.reward_map[index].setGeometry(
+    def update_reward(self, label: Label, reward_info: RewardItem):
+        reward = self.reward_map[label.label_id.pos]
+        item_geo = label.geometry()
+        reward.setText(reward_info.name)
+        reward.setGeometry(
             QRect(
                 item_geo.x() + reward_info.pos.x,
                 item_geo.y() + reward_info.pos.y,
@@ -185,6 +233,14 @@ class Inventory:
         # { item_index: { pos_index: data } }
         self.label_map: dict[int, dict[int, Label]] = {}
 
+    def get_label(self, label_id: LabelId):
+        """Returns the item's label of an identity, the overlays (counter, flag, extra image) are attached to it"""
+
+        if label_id.inventory != self.index:
+            return None
+
+        return self.label_map.get(label_id.item, {}).get(label_id.pos)
+
 
 @dataclass
 class GoModeSettings:
@@ -198,10 +254,14 @@ class GoModeSettings:
 
 
 class Config:
-    def __init__(self, widget: QWidget, config_path: Path):
+    def __init__(
+        self, widget: QWidget, config_path: Path, inventory: Optional[int] = None, register_fonts: bool = True
+    ):
         self.widget = widget
         self.config_path = config_path
         self.config_dir = self.config_path.parent
+        # the file the config was opened from, the zip archive if it was extracted
+        self.source_path = config_path
 
         self.default_inv = 0
         self.fonts: list[Font] = []
@@ -213,6 +273,23 @@ class Config:
         self.extras: Optional[Extras] = None
         self.state_saved = False
         self.autosave_enabled = False
+        self.journal_enabled = False
+        self.database_enabled = False
+
+        # decoded images, shared by the labels using the same path
+        self.pixmaps: dict[Path, QPixmap] = {}
+
+        # modification time of the decoded images' files, to find the images that changed (see ``pop_changed_images``)
+        self.image_times: dict[Path, Optional[int]] = {}
+
+        # images decoded in the background before the tracker is created (see ``get_image_paths``)
+        self.images: dict[Path, QImage] = {}
+
+        # ids returned by Qt when registering the fonts
+        self.font_ids: list[int] = []
+
+        # resolved folders of the parsed paths
+        self.folders: dict[str, Path] = {}
 
         self.label_gomode: Optional[Label] = None
         self.label_gomode_light: Optional[RotationWidget] = None
@@ -225,15 +302,122 @@ class Config:
 
         self.validate()
 
-        # register external fonts
-        for font in self.fonts:
-            if font.path.exists():
-                QFontDatabase.addApplicationFont(str(font.path.resolve()))
-            else:
-                show_error(self.widget, f"ERROR: this font doesn't exist '{font.path}'")
+        # register external fonts, unless the config is parsed again to be compared to the current one
+        if register_fonts:
+            with PROFILER.span("Config.register_fonts"):
+                for font in self.fonts:
+                    self.register_font(font)
 
         # set the active inventory from default value
-        self.active_inv = self.inventories[self.default_inv]
+        if inventory is not None and inventory not in self.inventories:
+            show_error(self.widget, f"ERROR: there's no inventory at index {inventory}, using the default one")
+            inventory = None
+
+        self.active_inv = self.inventories[inventory if inventory is not None else self.default_inv]
+        self.fingerprint = self.get_fingerprint()
+
+    def new_session(self):
+        """
+        Returns a copy of the config for a tracker, what the tracker changes (counters, labels, options)
+        isn't shared with this config. The parsed settings and the decoded images are shared.
+        """
+
+        config = copy(self)
+        config.inventories = {}
+
+        for index, inventory in self.inventories.items():
+            session_inv = copy(inventory)
+            session_inv.label_map = {}
+            session_inv.items = [
+                replace(item, counter=replace(item.counter) if item.counter is not None else None, reward_map={})
+                for item in inventory.items
+            ]
+            config.inventories[index] = session_inv
+
+        config.active_inv = config.inventories[self.active_inv.index]
+        config.label_gomode = None
+        config.label_gomode_light = None
+        return config
+
+    def get_fingerprint(self):
+        """Hashes the layout of the inventories, two configs with the same fingerprint can share states"""
+
+        layout = hashlib.sha1()
+
+        for inv in self.inventories.values():
+            for item in inv.items:
+                layout.update(
+                    f"{inv.index};{item.index};{item.name};{len(item.positions)};{len(item.paths)}\n".encode()
+                )
+
+        return layout.hexdigest()
+
+    def get_image_paths(self):
+        """Returns the path of every image the tracker of the active inventory uses"""
+
+        paths: list[Path] = [self.active_inv.background]
+
+        if self.gomode_settings is not None:
+            paths.append(self.gomode_settings.path)
+
+            if self.gomode_settings.light_path is not None:
+                paths.append(self.gomode_settings.light_path)
+
+        for item in self.active_inv.items:
+            paths.extend(item.paths)
+
+        if self.extras is not None:
+            paths.extend(extra.path for extra in self.extras.items)
+
+        return list(dict.fromkeys(paths))
+
+    def register_font(self, font: Font):
+        if font.path.exists():
+            self.font_ids.append(QFontDatabase.addApplicationFont(str(font.path.resolve())))
+        else:
+            show_error(self.widget, f"ERROR: this font doesn't exist '{font.path}'")
+
+    def get_image_time(self, path: Path):
+        try:
+            return path.stat().st_mtime_ns
+        except OSError:
+            return None
+
+    def get_pixmap(self, path: Path):
+        pixmap = self.pixmaps.get(path)
+
+        if pixmap is None:
+            image = self.images.pop(path, None)
+            pixmap = QPixmap.fromImage(image) if image is not None else QPixmap(str(path))
+            self.pixmaps[path] = pixmap
+            self.image_times[path] = self.get_image_time(path)
+
+        return pixmap
+
+    def pop_changed_images(self):
+        """Removes the decoded images whose file changed since they were decoded, returns their paths"""
+
+        changed = set(path for path, time in self.image_times.items() if self.get_image_time(path) != time)
+
+        for path in changed:
+            self.pixmaps.pop(path, None)
+            self.images.pop(path, None)
+            del self.image_times[path]
+
+        return changed
+
+    def get_image_size(self, path: Path):
+        """Returns (width, height) of the image, without decoding it if it wasn't already"""
+
+        pixmap = self.pixmaps.get(path)
+        image = self.images.get(path)
+
+        if pixmap is not None:
+            return pixmap.width(), pixmap.height()
+        elif image is not None:
+            return image.width(), image.height()
+
+        return Image.open(path).size
 
     def get_text_settings(self, text_settings_index: int):
         return self.text_settings[text_settings_index]
@@ -268,12 +452,23 @@ class Config:
 
     def parse_path(self, raw_path: Optional[str], name: str, raise_error: bool):
         if raw_path is not None:
-            return Path(self.config_dir / raw_path).resolve()
+            raw_folder, file_name = os.path.split(raw_path)
+
+            if file_name in {"", ".", ".."}:
+                return Path(self.config_dir / raw_path).resolve()
+
+            # resolving a path is slow (one system call per folder), the folders are shared by many paths
+            folder = self.folders.get(raw_folder)
+            if folder is None:
+                folder = self.folders[raw_folder] = Path(self.config_dir / raw_folder).resolve()
+
+            return folder / file_name
         elif raise_error:
             show_error(self.widget, f"ERROR: Missing path(s) for item '{name}'")
 
         return None
 
+    @profiled
     def parse_xml_config(self):
         try:
             root = ET.parse(self.config_path).getroot()
@@ -288,6 +483,8 @@ class Config:
 
         p = config.get("StatePath")
         self.state_path = Path(p).resolve() if p is not None else None
+        self.journal_enabled = self.parse_bool(config.get("Journal", "False"))
+        self.database_enabled = self.parse_bool(config.get("Database", "False"))
 
         for elem in config:
             match elem.tag:
@@ -442,6 +639,7 @@ class Config:
                 case _:
                     show_error(self.widget, f"ERROR: unknown configuration tag: '{elem.tag}'")
 
+    @profiled
     def validate(self):
         if len(self.fonts) == 0:
             show_error(self.widget, "ERROR: you need at least one font")
@@ -0,0 +1,164 @@
+import time
+import zlib
+import sqlite3
+
+from contextlib import closing
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from config import Config
+from state import State, StateBackend
+
+
+DATABASE_PATH = Path("sessions.db").resolve()
+
+# every query used below is covered by one of the indices
+DATABASE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS sessions (
+        id INTEGER PRIMARY KEY,
+        fingerprint TEXT NOT NULL,
+        inventory INTEGER NOT NULL,
+        started REAL NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS states (
+        id INTEGER PRIMARY KEY,
+        session INTEGER NOT NULL REFERENCES sessions (id),
+        fingerprint TEXT NOT NULL,
+        inventory INTEGER NOT NULL,
+        time REAL NOT NULL,
+        autosave INTEGER NOT NULL,
+        data BLOB NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS sessions_by_config ON sessions (fingerprint, inventory, started);
+    CREATE INDEX IF NOT EXISTS states_by_config ON states (fingerprint, inventory, time);
+    CREATE INDEX IF NOT EXISTS states_by_session ON states (session, time);
+"""
+
+
+@dataclass
+class SessionEntry:
+    id: int
+    started: float
+
+
+@dataclass
+class StateEntry:
+    id: int
+    session: int
+    time: float
+    autosave: bool
+
+
+class SessionDatabase:
+    """
+    SQLite store of every saved and autosaved state, grouped by sessions (one per opened tracker).
+    A connection is opened for each query so the database can be used from the autosave thread.
+    """
+
+    def __init__(self, path: Path = DATABASE_PATH):
+        self.path = path
+
+        with closing(self.connect()) as connection:
+            connection.executescript(DATABASE_SCHEMA)
+
+    def connect(self):
+        return sqlite3.connect(self.path)
+
+    def start_session(self, config: Config):
+        with closing(self.connect()) as connection, connection:
+            cursor = connection.execute(
+                "INSERT INTO sessions (fingerprint, inventory, started) VALUES (?, ?, ?)",
+                (config.fingerprint, config.active_inv.index, time.time()),
+            )
+
+            return cursor.lastrowid
+
+    def add_state(self, session: int, state: State, autosave: bool):
+        with closing(self.connect()) as connection, connection:
+            connection.execute(
+                "INSERT INTO states (session, fingerprint, inventory, time, autosave, data) VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    session,
+                    state.config.fingerprint,
+                    state.config.active_inv.index,
+                    time.time(),
+                    autosave,
+                    zlib.compress(state.to_json().encode()),
+                ),
+            )
+
+    def get_sessions(self, config: Config, limit: int = 50):
+        """Returns the latest sessions of the config, from the newest to the oldest"""
+
+        with closing(self.connect()) as connection:
+            rows = connection.execute(
+                "SELECT id, started FROM sessions WHERE fingerprint = ? AND inventory = ? "
+                + "ORDER BY started DESC LIMIT ?",
+                (config.fingerprint, config.active_inv.index, limit),
+            ).fetchall()
+
+        return [SessionEntry(*row) for row in rows]
+
+    def get_states(self, session: int, limit: int = 200):
+        """Returns the latest states of a session, from the newest to the oldest"""
+
+        with closing(self.connect()) as connection:
+            rows = connection.execute(
+                "SELECT id, session, time, autosave FROM states WHERE session = ? ORDER BY time DESC LIMIT ?",
+                (session, limit),
+            ).fetchall()
+
+        return [StateEntry(row[0], row[1], row[2], bool(row[3])) for row in rows]
+
+    def get_latest_data(self, config: Config, session: Optional[int] = None, point: Optional[float] = None):
+        """
+        Returns the data of the latest state of the config, or of the session if set,
+        saved at or before ``point`` if set (restore to point), None if there's no state
+        """
+
+        if session is not None:
+            query = "SELECT data FROM states WHERE session = ? AND time <= ? ORDER BY time DESC LIMIT 1"
+            args = (session, point if point is not None else float("inf"))
+        else:
+            query = (
+                "SELECT data FROM states WHERE fingerprint = ? AND inventory = ? AND time <= ? "
+                + "ORDER BY time DESC LIMIT 1"
+            )
+            args = (config.fingerprint, config.active_inv.index, point if point is not None else float("inf"))
+
+        with closing(self.connect()) as connection:
+            row = connection.execute(query, args).fetchone()
+
+        return zlib.decompress(row[0]).decode() if row is not None else None
+
+
+class DatabaseBackend(StateBackend):
+    """Reads and writes states from the session database instead of a file"""
+
+    def __init__(
+        self,
+        database: SessionDatabase,
+        session: Optional[int] = None,
+        point: Optional[float] = None,
+        autosave: bool = False,
+    ):
+        self.database = database
+        self.session = session
+        self.point = point
+        self.autosave = autosave
+
+    def read(self, state: State):
+        data = self.database.get_latest_data(state.config, self.session, self.point)
+
+        if data is None:
+            print("WARNING: no state found in the session database")
+            return False
+
+        return state.get_states_from_json(data)
+
+    def write(self, state: State):
+        if self.session is None:
+            self.session = self.database.start_session(state.config)
+
+        self.database.add_state(self.session, state, self.autosave)
@@ -0,0 +1,288 @@
+import sys
+import time
+import threading
+import traceback
+
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Optional, TYPE_CHECKING
+
+from PyQt6.QtCore import Qt, QThread, QTimer
+from PyQt6.QtGui import QPixmap, QFontDatabase
+from PyQt6.QtWidgets import QWidget, QLabel, QGraphicsEffect
+
+from common import Label
+
+if TYPE_CHECKING:
+    from config import Config
+
+
+@dataclass
+class Stall:
+    time: datetime
+    duration: float  # milliseconds the event loop was blocked for
+    stack: list[str]  # python stack of the GUI thread while it was blocked
+
+
+class StallWatchdog(QThread):
+    """
+    Measures the latency of the event loop with a heartbeat timer on the GUI thread,
+    the watchdog thread captures the GUI thread's stack when the heartbeat is late by more than ``threshold`` ms.
+    Must be created from the GUI thread. Only the ``keep`` longest stalls are kept.
+    """
+
+    def __init__(self, interval: int = 20, threshold: float = 100, frame_threshold: float = 16, keep: int = 20):
+        super().__init__()
+
+        self.interval = interval
+        self.threshold = threshold
+        self.frame_threshold = frame_threshold
+        self.keep = keep
+        self.gui_thread_id = threading.get_ident()
+
+        self.stalls: list[Stall] = []
+        self.current: Optional[Stall] = None
+        self.lock = threading.Lock()
+
+        # statistics of the heartbeat, latencies in milliseconds
+        self.beats = 0
+        self.late_beats = 0
+        self.max_latency = 0.0
+        self.last_beat = time.perf_counter()
+
+        self.heartbeat = QTimer()
+        self.heartbeat.setTimerType(Qt.TimerType.PreciseTimer)
+        self.heartbeat.timeout.connect(self.heartbeat_timeout)
+
+    def start_watching(self):
+        self.last_beat = time.perf_counter()
+        self.heartbeat.start(self.interval)
+        self.start()
+
+    def stop_watching(self):
+        self.heartbeat.stop()
+        self.requestInterruption()
+        self.wait()
+
+    def heartbeat_timeout(self):
+        # GUI thread
+        now = time.perf_counter()
+        latency = (now - self.last_beat) * 1000 - self.interval
+        self.last_beat = now
+        self.beats += 1
+        self.max_latency = max(self.max_latency, latency)
+
+        if latency > self.frame_threshold:
+            self.late_beats += 1
+
+        with self.lock:
+            if self.current is not None:
+                self.current.duration = latency
+                self.stalls.append(self.current)
+                self.stalls.sort(key=lambda stall: stall.duration, reverse=True)
+                del self.stalls[self.keep :]
+                self.current = None
+
+    def run(self):
+        # watchdog thread
+        while not self.isInterruptionRequested():
+            self.msleep(max(1, int(self.threshold / 4)))
+            latency = (time.perf_counter() - self.last_beat) * 1000 - self.interval
+
+            with self.lock:
+                if latency > self.threshold and self.current is None:
+                    frame = sys._current_frames().get(self.gui_thread_id)
+                    stack = traceback.format_stack(frame) if frame is not None else []
+                    self.current = Stall(datetime.now(), latency, stack)
+
+    def get_report(self):
+        with self.lock:
+            stalls = list(self.stalls)
+
+        lines = [
+            f"Heartbeat: every {self.interval} ms, {self.beats} beats",
+            f"Late by more than {self.frame_threshold:g} ms: {self.late_beats}",
+            f"Longest latency: {self.max_latency:.1f} ms",
+            f"Stalls longer than {self.threshold:g} ms (longest first): {len(stalls)}",
+        ]
+
+        for stall in stalls:
+            lines.append("")
+            lines.append(f"{stall.time.strftime('%H:%M:%S.%f')[:-3]}: blocked for {stall.duration:.1f} ms")
+            lines.extend(line.rstrip() for line in stall.stack)
+
+        return "\n".join(lines)
+
+
+WATCHDOG: Optional[StallWatchdog] = None
+
+
+def get_watchdog():
+    """Returns the watchdog of the program, created on the first call (from the GUI thread)"""
+
+    global WATCHDOG
+
+    if WATCHDOG is None:
+        WATCHDOG = StallWatchdog()
+
+    return WATCHDOG
+
+
+@dataclass
+class PixmapEntry:
+    category: str
+    name: str
+    width: int
+    height: int
+    size: int  # bytes
+
+
+@dataclass
+class MemoryUsage:
+    pixmaps: list[PixmapEntry] = field(default_factory=list)
+    effects: int = 0
+    active_effects: int = 0
+    effect_buffers: int = 0  # estimated bytes
+    widgets: Counter = field(default_factory=Counter)
+    fonts: list[tuple[str, int]] = field(default_factory=list)  # (family, file size)
+    font_registrations: int = 0
+
+    def get_totals(self):
+        """Returns {category: (count, bytes)}"""
+
+        totals: dict[str, tuple[int, int]] = {}
+
+        for entry in self.pixmaps:
+            count, size = totals.get(entry.category, (0, 0))
+            totals[entry.category] = (count + 1, size + entry.size)
+
+        return totals
+
+
+class MemoryAccounting:
+    """
+    Estimates the memory used by a config's tracker: pixmaps (each image is counted once even if it's shared),
+    graphics effects, widgets and fonts. The sizes are the uncompressed size of the images.
+    """
+
+    def __init__(self, config: "Config", window: Optional[QWidget] = None):
+        self.config = config
+        self.window = window
+        self.usage = MemoryUsage()
+        self.seen: set[int] = set()
+
+        # to name the pixmaps loaded from the cache with their path
+        self.paths = {pixmap.cacheKey(): path for path, pixmap in self.config.pixmaps.items()}
+
+    def add_pixmap(self, category: str, name: str, pixmap: Optional[QPixmap]):
+        if pixmap is None or pixmap.isNull() or pixmap.cacheKey() in self.seen:
+            return
+
+        self.seen.add(pixmap.cacheKey())
+        path = self.paths.get(pixmap.cacheKey())
+        self.usage.pixmaps.append(
+            PixmapEntry(
+                category,
+                path.name if path is not None else name,
+                pixmap.width(),
+                pixmap.height(),
+                pixmap.width() * pixmap.height() * pixmap.depth() // 8,
+            )
+        )
+
+    def add_label(self, category: str, label: Label):
+        self.add_pixmap(category, label.objectName(), label.original_pixmap)
+        # anything else than the original image is a copy made to change the opacity
+        self.add_pixmap("opacity copies", label.objectName(), label.pixmap())
+
+    def get_usage(self):
+        # only the inventories shown on the tracker have labels
+        for inventory in self.config.inventories.values():
+            for sub_map in inventory.label_map.values():
+                for label in sub_map.values():
+                    self.add_label("originals", label)
+
+                    if label.label_extra_img is not None:
+                        self.add_label("extras", label.label_extra_img)
+
+        if self.config.label_gomode is not None:
+            self.add_label("go mode", self.config.label_gomode)
+
+        if self.config.label_gomode_light is not None:
+            self.add_pixmap("light", "label_gomode_light", self.config.label_gomode_light.image)
+
+        for inv in self.config.inventories.values():
+            self.add_pixmap("icons", f"icon of '{inv.name}'", inv.icon)
+
+        if self.window is not None:
+            # the backgrounds come from the cache too, they're counted as backgrounds before the rest of the cache
+            for bg_label in self.window.findChildren(QLabel, "bg_label"):
+                self.add_pixmap("background", "bg_label", bg_label.pixmap())
+
+        for path, pixmap in self.config.pixmaps.items():
+            self.add_pixmap("cache", path.name, pixmap)
+
+        if self.window is not None:
+            for widget in self.window.findChildren(QWidget):
+                self.usage.widgets[type(widget).__name__] += 1
+
+            for effect in self.window.findChildren(QGraphicsEffect):
+                self.usage.effects += 1
+
+                # an effect that isn't a no-op renders its widget into an offscreen ARGB32 pixmap
+                if effect.isEnabled() and getattr(effect, "strength", lambda: 1.0)() > 0.0:
+                    widget = effect.parent()
+                    self.usage.active_effects += 1
+
+                    if isinstance(widget, QWidget):
+                        ratio = widget.devicePixelRatioF()
+                        self.usage.effect_buffers += int(widget.width() * widget.height() * 4 * ratio * ratio)
+
+        for font in self.config.fonts:
+            self.usage.fonts.append((font.name, font.path.stat().st_size if font.path.exists() else 0))
+
+        self.usage.font_registrations = sum(
+            len(QFontDatabase.applicationFontFamilies(font_id)) > 0 for font_id in self.config.font_ids
+        )
+
+        return self.usage
+
+
+def get_memory_report(config: "Config", window: Optional[QWidget] = None, top: int = 20):
+    usage = MemoryAccounting(config, window).get_usage()
+    totals = usage.get_totals()
+    total_pixmaps = sum(size for _, size in totals.values())
+
+    lines = [f"Configuration: {config.config_path}", "", "Pixmaps (uncompressed, shared images counted once):"]
+
+    for category, (count, size) in sorted(totals.items(), key=lambda item: item[1][1], reverse=True):
+        lines.append(f"    {category:<16}{count:>8} pixmaps{size / 1024:>12.1f} KiB")
+
+    lines.append(f"    {'total':<16}{len(usage.pixmaps):>8} pixmaps{total_pixmaps / 1024:>12.1f} KiB")
+    lines.append("")
+    lines.append(f"Largest {top} pixmaps:")
+
+    for entry in sorted(usage.pixmaps, key=lambda entry: entry.size, reverse=True)[:top]:
+        lines.append(
+            f"    {entry.size / 1024:>10.1f} KiB  {entry.width}x{entry.height}  {entry.category}: {entry.name}"
+        )
+
+    lines.append("")
+    lines.append(
+        f"Graphics effects: {usage.effects} ({usage.active_effects} active, "
+        + f"~{usage.effect_buffers / 1024:.1f} KiB of offscreen buffers when painted)"
+    )
+    lines.append("")
+    lines.append(f"Widgets: {sum(usage.widgets.values())}")
+
+    for name, count in usage.widgets.most_common():
+        lines.append(f"    {name:<24}{count:>8}")
+
+    lines.append("")
+    lines.append(f"Fonts: {len(usage.fonts)} ({usage.font_registrations} registered by this config)")
+
+    for name, size in usage.fonts:
+        lines.append(f"    {name:<32}{size / 1024:>10.1f} KiB")
+
+    return "\n".join(lines)
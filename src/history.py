@@ -0,0 +1,120 @@
+import sys
+
+from collections import deque
+from dataclasses import dataclass, astuple, fields
+from typing import Any, Optional
+
+from config import Config
+from common import Label, LabelId
+from state import State, LabelState, Action, ActionKind
+
+
+LABEL_STATE_FIELDS = [field.name for field in fields(LabelState)]
+GOMODE_STATE_FIELDS = ["gomode_visibility", "gomode_light_visibility"]
+
+
+@dataclass
+class HistoryEntry:
+    action: Action
+    # (field, value before the action, value after the action), only for the fields the action changed
+    changes: tuple[tuple[str, Any, Any], ...]
+
+    def get_size(self):
+        return (
+            sys.getsizeof(self)
+            + sys.getsizeof(self.action)
+            + sys.getsizeof(self.changes)
+            + sum(sys.getsizeof(change) for change in self.changes)
+        )
+
+
+class History:
+    """
+    Undo and redo stacks of the tracker's actions, the undo stack is a ring buffer dropping the oldest entries.
+    Undoing or redoing an entry only updates the label it belongs to.
+    """
+
+    def __init__(self, config: Config, limit: int = 1000):
+        self.config = config
+        self.state = State(self.config)
+        self.undo_stack: deque[HistoryEntry] = deque()
+        self.redo_stack: list[HistoryEntry] = []
+        self.limit = limit
+        self.size = 0
+
+    def get_memory_usage(self):
+        """Returns the approximate size of the entries in bytes"""
+
+        return self.size
+
+    def clear(self):
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+        self.size = 0
+
+    def capture(self, action: Action, label: Optional[Label]):
+        if action.kind == ActionKind.GOMODE:
+            self.state.get_gomode_state()
+            return (self.state.gomode_visibility, self.state.gomode_light_visibility)
+
+        return astuple(self.state.get_label_state(label))
+
+    def push(self, action: Action, before: tuple, after: tuple):
+        names = GOMODE_STATE_FIELDS if action.kind == ActionKind.GOMODE else LABEL_STATE_FIELDS
+        changes = tuple((name, old, new) for name, old, new in zip(names, before, after) if old != new)
+
+        if len(changes) == 0:
+            return
+
+        if len(self.undo_stack) == self.limit:
+            self.size -= self.undo_stack.popleft().get_size()
+
+        entry = HistoryEntry(action, changes)
+        self.undo_stack.append(entry)
+        self.size += entry.get_size()
+
+        for entry in self.redo_stack:
+            self.size -= entry.get_size()
+
+        self.redo_stack.clear()
+
+    def apply(self, entry: HistoryEntry, undo: bool):
+        """Restores the values before (undo) or after (redo) the action, returns the updated label"""
+
+        if entry.action.kind == ActionKind.GOMODE:
+            self.state.get_gomode_state()
+
+            for name, old, new in entry.changes:
+                setattr(self.state, name, old if undo else new)
+
+            self.state.apply_gomode_state()
+            return None
+
+        label_id = LabelId(self.config.active_inv.index, entry.action.index, entry.action.pos_index)
+        label = self.config.active_inv.get_label(label_id)
+
+        if label is not None:
+            label_state = self.state.get_label_state(label)
+
+            for name, old, new in entry.changes:
+                setattr(label_state, name, old if undo else new)
+
+            self.state.apply_label_state(label_state)
+
+        return label
+
+    def undo(self):
+        if len(self.undo_stack) == 0:
+            return None
+
+        entry = self.undo_stack.pop()
+        self.redo_stack.append(entry)
+        return entry
+
+    def redo(self):
+        if len(self.redo_stack) == 0:
+            return None
+
+        entry = self.redo_stack.pop()
+        self.undo_stack.append(entry)
+        return entry
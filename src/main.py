@@ -1,17 +1,25 @@
 #!/usr/bin/env python3
 
+import time
+
+# taken before importing anything else to measure the startup (--measure-startup)
+START_TIME = time.perf_counter()
+
 import sys
 import os
+import json
+import hashlib
+import argparse
+import tempfile
 import traceback
 
 from zipfile import ZipFile
 from pathlib import Path
-from typing import Optional
-from copy import copy
+from typing import Optional, TYPE_CHECKING
 from shutil import rmtree
 
-from PyQt6.QtGui import QIcon, QPixmap, QShowEvent, QCloseEvent
-from PyQt6.QtCore import QSize, QRect
+from PyQt6.QtGui import QIcon, QPixmap, QImage, QShowEvent, QCloseEvent, QPaintEvent
+from PyQt6.QtCore import QSize, QRect, QTimer, QThread, QModelIndex
 from PyQt6.QtWidgets import (
     QWidget,
     QLabel,
@@ -24,22 +32,108 @@ from PyQt6.QtWidgets import (
 )
 
 from common import ListViewModel, show_error
-from config import Config
-from tracker import TrackerWindow
+from diagnostics import get_watchdog
+from settings import Settings
+
+# the config and the tracker (and their dependencies) are imported once they're needed
+if TYPE_CHECKING:
+    from config import Config
+    from tracker import TrackerWindow, TrackerPool
 
 TEMP_DIR = Path("temp").resolve()
 TEMP_ICONS_DIR = TEMP_DIR / "icons"
 TEMP_CONFIG_DIR = TEMP_DIR / "config"
 
+# seconds since START_TIME for each step of the startup
+STARTUP_TIMES: dict[str, float] = {"imports": time.perf_counter() - START_TIME}
+
+
+def mark_startup(step: str):
+    if step not in STARTUP_TIMES:
+        STARTUP_TIMES[step] = time.perf_counter() - START_TIME
+
+
+def print_startup_times():
+    print(json.dumps({step: round(value * 1000, 2) for step, value in STARTUP_TIMES.items()}))
+
+
+def get_zip_folder(zip_path: Path):
+    """Returns the folder where the zip is extracted, each zip has its own (zips with the same name too)"""
+
+    path_hash = hashlib.sha1(str(zip_path.resolve()).encode()).hexdigest()[:12]
+    return TEMP_CONFIG_DIR / f"{zip_path.stem}_{path_hash}"
+
+
+class ZipExtractor(QThread):
+    """Extracts a zip in the background, one file at a time so it can be cancelled"""
+
+    def __init__(self, zip_path: Path):
+        super().__init__()
+
+        self.zip_path = zip_path
+        self.complete = False
+
+    def run(self):
+        with ZipFile(self.zip_path, "r") as zip_file:
+            for info in zip_file.infolist():
+                if self.isInterruptionRequested():
+                    return
+
+                zip_file.extract(info, get_zip_folder(self.zip_path))
+
+        self.complete = True
+
+
+class ImageDecoder(QThread):
+    """
+    Decodes the images of a config in the background, unlike ``QPixmap`` a ``QImage`` can be used outside
+    of the GUI thread. The images are converted to the format of the pixmaps so the conversion is only a copy.
+    """
+
+    def __init__(self, config: "Config"):
+        super().__init__()
+
+        self.config = config
+        self.paths = config.get_image_paths()
+        self.images: dict[Path, QImage] = {}
+
+    def run(self):
+        for path in self.paths:
+            if self.isInterruptionRequested():
+                return
+
+            image = QImage(str(path))
+
+            if not image.isNull():
+                if image.hasAlphaChannel():
+                    image = image.convertToFormat(QImage.Format.Format_ARGB32_Premultiplied)
+                else:
+                    image = image.convertToFormat(QImage.Format.Format_RGB32)
+
+                self.images[path] = image
+
 
 class MainWindow(QMainWindow):
-    def __init__(self):
+    def __init__(self, settings: Settings, measure_startup: bool = False):
         super().__init__()
 
-        self.configs: dict[Path, Config] = {}
+        self.settings = settings
+        self.configs: dict[Path, "Config"] = {}
         self.config_dir = Path()
+        # the zip or the config file of each row of the list
+        self.sources: list[Path] = []
+        # the zips that were completely extracted
+        self.extracted: set[Path] = set()
         self.model_cache: list[tuple[bool, str, QPixmap]] = []
-        self.tracker_window: Optional[TrackerWindow] = None
+        self.tracker_window: Optional["TrackerWindow"] = None
+        self.pool: Optional["TrackerPool"] = None
+        self.measure_startup = measure_startup
+        self.painted = False
+
+        # the selected config is prepared in the background (see ``list_configs_current_changed``)
+        self.extractor: Optional[ZipExtractor] = None
+        self.decoder: Optional[ImageDecoder] = None
+        self.preloaded: Optional["Config"] = None
 
         self.setWindowTitle("SaucisseTracker")
         self.setObjectName("MainWindow")
@@ -103,43 +197,168 @@ class MainWindow(QMainWindow):
         self.btn_go.clicked.connect(self.btn_go_clicked)
         self.list_configs.doubleClicked.connect(self.btn_go_clicked)
 
-        # set the default config folder path
-        self.line_edit_config_folder.setText(str(Path("config/").resolve()))
-
         # not implemented yet
         self.btn_new.setEnabled(False)
         self.btn_edit.setEnabled(False)
         self.btn_delete.setEnabled(False)
 
+        # the default config folder is scanned once the window is painted
+        self.line_edit_config_folder.setPlaceholderText("Loading...")
+        mark_startup("window")
+
+    def paintEvent(self, e: Optional[QPaintEvent]):
+        super(QMainWindow, self).paintEvent(e)
+
+        if not self.painted:
+            self.painted = True
+            mark_startup("first_paint")
+            QTimer.singleShot(0, self.set_default_config_dir)
+
+    def set_default_config_dir(self):
+        # set the last config folder path, or the default one
+        if self.settings.config_dir is not None and Path(self.settings.config_dir).is_dir():
+            self.line_edit_config_folder.setText(self.settings.config_dir)
+        else:
+            self.line_edit_config_folder.setText(str(Path("config/").resolve()))
+
+        mark_startup("interactive")
+
+        if self.measure_startup:
+            print_startup_times()
+            self.close()
+
     def showEvent(self, e: Optional[QShowEvent]):
         super(QMainWindow, self).showEvent(e)
 
-        # if the folder isn't empty
-        if any(TEMP_CONFIG_DIR.iterdir()):
-            rmtree(TEMP_CONFIG_DIR)
-            TEMP_CONFIG_DIR.mkdir()
-            self.configs.pop(TEMP_CONFIG_DIR / "config.xml")
-
+        # the closed tracker is kept to be reopened quickly, the extracted zips are deleted when closing the menu
         if self.tracker_window is not None:
+            self.get_pool().add(self.tracker_window)
             self.tracker_window = None
 
     def closeEvent(self, e: Optional[QCloseEvent]):
         super(QMainWindow, self).closeEvent(e)
+        self.stop_preload()
 
         # delete the temporary folder
         rmtree(TEMP_DIR)
 
+    def get_pool(self):
+        from tracker import TrackerPool
+
+        if self.pool is None:
+            self.pool = TrackerPool()
+
+        return self.pool
+
+    def get_config(self, row: int):
+        """Returns the config of a row of the list, a zip is extracted and parsed the first time"""
+
+        from config import Config
+
+        source = self.sources[row]
+
+        if source.suffix != ".zip":
+            return self.configs[source]
+
+        xml_path = get_zip_folder(source) / "config.xml"
+
+        if xml_path not in self.configs:
+            if source not in self.extracted:
+                with ZipFile(source, "r") as zip_file:
+                    zip_file.extractall(get_zip_folder(source))
+
+                self.extracted.add(source)
+
+            self.configs[xml_path] = Config(self, xml_path)
+            self.configs[xml_path].source_path = source
+
+        return self.configs[xml_path]
+
+    def start_decoder(self, config: "Config"):
+        self.preloaded = config
+        self.decoder = ImageDecoder(config)
+        self.decoder.finished.connect(self.decoder_finished)
+        self.decoder.start()
+
+    def stop_preload(self):
+        """Stops preparing the selected config, the images that are already decoded are kept"""
+
+        if self.extractor is not None:
+            self.extractor.finished.disconnect()
+            self.extractor.requestInterruption()
+            self.extractor.wait()
+            self.extractor = None
+
+        if self.decoder is not None:
+            self.decoder.finished.disconnect()
+            self.decoder.requestInterruption()
+            self.decoder.wait()
+            self.decoder.config.images.update(self.decoder.images)
+            self.decoder = None
+
     # connections callbacks
 
+    def list_configs_current_changed(self, current: QModelIndex, previous: QModelIndex):
+        try:
+            self.stop_preload()
+
+            # only the selected config's images are kept in memory
+            if self.preloaded is not None:
+                self.preloaded.images.clear()
+                self.preloaded = None
+
+            if not current.isValid():
+                return
+
+            source = self.sources[current.row()]
+
+            # a zip is extracted in the background and parsed once it's done, parsing needs the GUI thread
+            if source.suffix == ".zip" and get_zip_folder(source) / "config.xml" not in self.configs:
+                self.extractor = ZipExtractor(source)
+                self.extractor.finished.connect(self.extractor_finished)
+                self.extractor.start()
+            else:
+                self.start_decoder(self.get_config(current.row()))
+        except Exception:
+            show_error(self, f"An error occurred\n\n{traceback.format_exc()}")
+
+    def extractor_finished(self):
+        # the signal may have been queued before the extraction was stopped
+        if self.sender() is not self.extractor:
+            return
+
+        try:
+            extractor = self.extractor
+            self.extractor = None
+
+            if extractor.complete:
+                self.extracted.add(extractor.zip_path)
+                self.start_decoder(self.get_config(self.list_configs.currentIndex().row()))
+        except Exception:
+            show_error(self, f"An error occurred\n\n{traceback.format_exc()}")
+
+    def decoder_finished(self):
+        if self.sender() is not self.decoder:
+            return
+
+        self.decoder.config.images.update(self.decoder.images)
+        self.decoder = None
+
     def btn_set_config_dir_clicked(self):
         try:
             path = QFileDialog.getExistingDirectory(None, "Open Splits Images Folder", str(Path.cwd()))
             if len(path) > 0:
                 self.line_edit_config_folder.setText(path)
+
+                self.settings = Settings.load()
+                self.settings.config_dir = str(Path(path).resolve())
+                self.settings.save()
         except Exception:
             show_error(self, f"An error occurred\n\n{traceback.format_exc()}")
 
     def get_configs(self, dir: Path):
+        from config import Config
+
         # any file that is called "config." with a format extension (xml, yml, json, etc...)
         for path in sorted(dir.rglob("config.*")):
             absolute = path.resolve()
@@ -147,9 +366,12 @@ class MainWindow(QMainWindow):
 
     def line_edit_config_folder_update(self):
         try:
+            self.stop_preload()
             self.config_dir = Path(self.line_edit_config_folder.text()).resolve()
             self.configs.clear()
+            self.sources.clear()
             self.model_cache.clear()
+            self.preloaded = None
             model_items = []
 
             # look for zip files
@@ -164,41 +386,146 @@ class MainWindow(QMainWindow):
 
                             icon = QPixmap(str(TEMP_ICONS_DIR / stuff.filename))
                             model_items.append((True, absolute.name, icon.scaledToHeight(32)))
+                            self.sources.append(absolute)
 
             self.get_configs(self.config_dir)
-            for config in self.configs.values():
+            for path, config in self.configs.items():
                 model_items.append((True, config.active_inv.name, config.active_inv.icon.scaledToHeight(32)))
+                self.sources.append(path)
 
             self.model_cache = [(elem[0], elem[1], elem[2]) for elem in model_items]
             self.list_configs.setModel(ListViewModel(self.model_cache))
+            self.list_configs.selectionModel().currentChanged.connect(self.list_configs_current_changed)
         except Exception:
             show_error(self, f"An error occurred\n\n{traceback.format_exc()}")
 
     def btn_go_clicked(self):
         try:
             index = self.list_configs.currentIndex()
-            item_name: str = list(self.list_configs.model().itemData(index).values())[0]
-
-            # extract the zip if we chose one
-            if item_name.endswith(".zip"):
-                zip_path = self.config_dir / item_name
-                zip_file = ZipFile(zip_path)
-                zip_file.extractall(TEMP_CONFIG_DIR)
-                xml_path = Path(TEMP_CONFIG_DIR / "config.xml").resolve()
 
-                self.configs[xml_path] = Config(self, xml_path)
-
-            if len(self.configs) > 0:
-                config = list(self.configs.values())[index.row()]
-                self.tracker_window = TrackerWindow(self, copy(config))
+            if index.isValid():
+                # what's not decoded yet is decoded when the labels are created
+                self.stop_preload()
+                config = self.get_config(index.row())
+                self.tracker_window = self.get_pool().open(self, config)
                 self.tracker_window.show()
                 self.hide()
         except Exception:
             show_error(self, f"An error occurred\n\n{traceback.format_exc()}")
 
 
+def parse_window_pos(value: str):
+    x, y = value.split(",")
+    return int(x), int(y)
+
+
+def open_tracker(args: argparse.Namespace, temp_dir: Path):
+    """Opens the tracker of the config given on the command line, without the main menu"""
+
+    from config import Config
+    from tracker import TrackerWindow
+
+    path: Path = args.config.resolve()
+    source = path
+
+    # a zip is extracted in its own folder, other trackers may be starting at the same time
+    if path.suffix == ".zip":
+        with ZipFile(path, "r") as zip_file:
+            zip_file.extractall(temp_dir)
+
+        path = temp_dir / "config.xml"
+    elif path.is_dir():
+        path = source = path / "config.xml"
+
+    if not path.exists():
+        sys.exit(f"ERROR: '{path}' doesn't exist")
+
+    config = Config(QWidget(), path, args.inventory)
+    # the archive is remembered (to resume the tracker), the temporary folder is deleted on exit
+    config.source_path = source
+
+    if args.state is not None:
+        config.state_path = args.state.resolve()
+
+    tracker_window = TrackerWindow(None, config)
+
+    if args.state is not None:
+        tracker_window.open_state()
+
+    if args.window_pos is not None:
+        tracker_window.move(*args.window_pos)
+
+    tracker_window.show()
+    return tracker_window
+
+
+def resume_tracker(main_window: MainWindow, settings: Settings, measure_startup: bool):
+    """Opens the last tracker and its state without scanning the config folder, the main menu is shown on close"""
+
+    from config import Config
+
+    path = Path(settings.config_path)
+    xml_path = path
+
+    if path.suffix == ".zip":
+        with ZipFile(path, "r") as zip_file:
+            zip_file.extractall(get_zip_folder(path))
+
+        xml_path = get_zip_folder(path) / "config.xml"
+
+    config = Config(main_window, xml_path, settings.inventory)
+    config.source_path = path
+    mark_startup("config")
+
+    # a state saved with another version of the config can't be applied
+    if config.fingerprint != settings.fingerprint:
+        print("WARNING: the configuration changed since the last session, the state isn't restored")
+    elif settings.state_path is not None and Path(settings.state_path).exists():
+        config.state_path = Path(settings.state_path)
+
+    main_window.tracker_window = main_window.get_pool().open(main_window, config)
+    mark_startup("tracker")
+
+    if config.state_path is not None:
+        main_window.tracker_window.open_state()
+
+    if settings.window_pos is not None:
+        main_window.tracker_window.move(*settings.window_pos)
+
+    main_window.tracker_window.show()
+    mark_startup("restored")
+
+    def tracker_shown():
+        mark_startup("interactive")
+
+        if measure_startup:
+            print_startup_times()
+            QApplication.quit()
+
+    QTimer.singleShot(0, tracker_shown)
+
+
 def main():
-    app = QApplication(sys.argv)
+    parser = argparse.ArgumentParser(description="SaucisseTracker")
+    parser.add_argument(
+        "--measure-startup",
+        action="store_true",
+        help="print the time to import the modules, create the window, paint it and scan the configs (ms), then exit",
+    )
+    parser.add_argument("--no-resume", action="store_true", help="show the main menu even if resuming is enabled")
+    parser.add_argument(
+        "--config",
+        type=Path,
+        help="open the tracker of this configuration directly (config file, zip or folder containing config.xml)",
+    )
+    parser.add_argument("--state", type=Path, help="with --config, the state file to use and open")
+    parser.add_argument("--inventory", type=int, help="with --config, the index of the inventory to use")
+    parser.add_argument(
+        "--window-pos", type=parse_window_pos, metavar="X,Y", help="with --config, the window's position"
+    )
+    args, qt_args = parser.parse_known_args()
+
+    app = QApplication(sys.argv[:1] + qt_args)
 
     # taskbar icon trick for Windows
     if os.name == "nt":
@@ -207,6 +534,19 @@ def main():
         # encoding probably useless but just in case
         windll.shell32.SetCurrentProcessExplicitAppUserModelID("saucisse.tracker".encode("UTF-8"))
 
+    # measures the event loop's latency and records the stalls
+    watchdog = get_watchdog()
+    watchdog.start_watching()
+
+    if args.config is not None:
+        # the shared temporary folder is left alone, it may belong to another instance
+        with tempfile.TemporaryDirectory(prefix="saucisse_") as temp_dir:
+            tracker_window = open_tracker(args, Path(temp_dir))
+            code = app.exec()
+
+        watchdog.stop_watching()
+        sys.exit(code)
+
     # delete temp folder to make sure there's no unwanted files that may create conflicts
     if TEMP_DIR.exists():
         rmtree(TEMP_DIR)
@@ -216,10 +556,17 @@ def main():
     TEMP_ICONS_DIR.mkdir()
     TEMP_CONFIG_DIR.mkdir()
 
-    main_window = MainWindow()
-    main_window.show()
+    settings = Settings.load()
+    main_window = MainWindow(settings, args.measure_startup)
+
+    if settings.can_resume() and not args.no_resume:
+        resume_tracker(main_window, settings, args.measure_startup)
+    else:
+        main_window.show()
 
-    sys.exit(app.exec())
+    code = app.exec()
+    watchdog.stop_watching()
+    sys.exit(code)
 
 
 # start the app
@@ -0,0 +1,213 @@
+import os
+import json
+import time
+import atexit
+import threading
+
+from collections import deque
+from contextlib import nullcontext
+from functools import wraps
+from pathlib import Path
+from typing import Optional
+
+from PyQt6.QtCore import QTimer
+from PyQt6.QtWidgets import (
+    QWidget,
+    QDialog,
+    QTableWidget,
+    QTableWidgetItem,
+    QPushButton,
+    QHBoxLayout,
+    QVBoxLayout,
+    QFileDialog,
+)
+
+
+# set to 1 to enable the profiler on startup, or to a path ending with ".json" to also export the trace when exiting
+PROFILER_ENV = "SAUCISSE_PROFILE"
+TRACE_FILE_FILTER = "Chrome traces (*.json)"
+
+
+class Span:
+    def __init__(self, profiler: "Profiler", name: str):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *args):
+        self.profiler.add(self.name, self.start, time.perf_counter_ns() - self.start)
+
+
+class Profiler:
+    """
+    Records the duration of the hot paths (spans), the latest ``max_events`` spans are kept for the trace
+    and every span is added to the summary. When disabled a span only costs a check of ``enabled``.
+    """
+
+    def __init__(self, max_events: int = 100000):
+        self.enabled = False
+        self.origin = time.perf_counter_ns()
+        self.lock = threading.Lock()
+        # (name, start, duration, thread id), times in nanoseconds
+        self.events: deque[tuple[str, int, int, int]] = deque(maxlen=max_events)
+        # name: [count, total duration, max duration]
+        self.summary: dict[str, list[int]] = {}
+
+    def set_enabled(self, enabled: bool):
+        self.enabled = enabled
+
+    def clear(self):
+        with self.lock:
+            self.events.clear()
+            self.summary.clear()
+
+    def add(self, name: str, start: int, duration: int):
+        with self.lock:
+            self.events.append((name, start, duration, threading.get_ident()))
+            entry = self.summary.get(name)
+
+            if entry is None:
+                self.summary[name] = [1, duration, duration]
+            else:
+                entry[0] += 1
+                entry[1] += duration
+                entry[2] = max(entry[2], duration)
+
+    def span(self, name: str):
+        return Span(self, name) if self.enabled else nullcontext()
+
+    def get_summary(self):
+        """Returns (name, count, total ms, mean ms, max ms) for every span, from the longest total to the shortest"""
+
+        with self.lock:
+            rows = [
+                (name, count, total / 1e6, total / count / 1e6, maximum / 1e6)
+                for name, (count, total, maximum) in self.summary.items()
+            ]
+
+        rows.sort(key=lambda row: row[2], reverse=True)
+        return rows
+
+    def to_chrome_trace(self):
+        """Returns the spans in the Trace Event Format (chrome://tracing, Perfetto)"""
+
+        pid = os.getpid()
+
+        with self.lock:
+            events = list(self.events)
+
+        return {
+            "traceEvents": [
+                {
+                    "name": name,
+                    "ph": "X",
+                    "ts": (start - self.origin) / 1000,
+                    "dur": duration / 1000,
+                    "pid": pid,
+                    "tid": tid,
+                }
+                for name, start, duration, tid in events
+            ],
+            "displayTimeUnit": "ms",
+        }
+
+    def export(self, path: Path):
+        with path.open("w") as file:
+            json.dump(self.to_chrome_trace(), file)
+
+
+PROFILER = Profiler()
+
+
+def profiled(func):
+    """Records a span named after the function each time it's called, if the profiler is enabled"""
+
+    name = func.__qualname__
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if not PROFILER.enabled:
+            return func(*args, **kwargs)
+
+        start = time.perf_counter_ns()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            PROFILER.add(name, start, time.perf_counter_ns() - start)
+
+    return wrapper
+
+
+class ProfilerWindow(QDialog):
+    """Live summary of the spans, refreshed every second"""
+
+    COLUMNS = ["Span", "Count", "Total (ms)", "Mean (ms)", "Max (ms)"]
+
+    def __init__(self, parent: Optional[QWidget]):
+        super().__init__(parent)
+
+        self.setWindowTitle("Profiler")
+        self.resize(640, 400)
+
+        self.table = QTableWidget(0, len(self.COLUMNS), self)
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.horizontalHeader().setStretchLastSection(True)
+
+        self.btn_clear = QPushButton("Clear", self)
+        self.btn_clear.clicked.connect(self.btn_clear_clicked)
+        self.btn_export = QPushButton("Export Trace", self)
+        self.btn_export.clicked.connect(self.btn_export_clicked)
+
+        buttons = QHBoxLayout()
+        buttons.addWidget(self.btn_clear)
+        buttons.addWidget(self.btn_export)
+
+        layout = QVBoxLayout(self)
+        layout.addWidget(self.table)
+        layout.addLayout(buttons)
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start(1000)
+        self.refresh()
+
+    def refresh(self):
+        rows = PROFILER.get_summary()
+        self.table.setRowCount(len(rows))
+
+        for i, (name, count, total, mean, maximum) in enumerate(rows):
+            values = [name, str(count), f"{total:.2f}", f"{mean:.3f}", f"{maximum:.3f}"]
+
+            for j, value in enumerate(values):
+                self.table.setItem(i, j, QTableWidgetItem(value))
+
+    def btn_clear_clicked(self):
+        PROFILER.clear()
+        self.refresh()
+
+    def btn_export_clicked(self):
+        export_trace(self)
+
+
+def export_trace(parent: Optional[QWidget]):
+    path = QFileDialog.getSaveFileName(parent, "Export Trace", str(Path.home() / "trace.json"), TRACE_FILE_FILTER)[0]
+
+    if len(path) > 0:
+        PROFILER.export(Path(path).resolve())
+
+
+def setup_from_env():
+    value = os.environ.get(PROFILER_ENV, "")
+
+    if value not in ("", "0"):
+        PROFILER.set_enabled(True)
+
+        if value.endswith(".json"):
+            atexit.register(PROFILER.export, Path(value).resolve())
+
+
+setup_from_env()
@@ -0,0 +1,199 @@
+import json
+import time
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, TYPE_CHECKING
+
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+from PyQt6.QtWidgets import QApplication
+
+from config import Config
+from state import State, Action, ActionKind
+
+if TYPE_CHECKING:
+    from tracker import TrackerWindow
+
+
+RECORDING_VERSION = 1
+
+# undo and redo aren't actions of the tracker but they need to be replayed too
+RECORD_UNDO = "undo"
+RECORD_REDO = "redo"
+
+
+@dataclass
+class RecordedAction:
+    time: float  # seconds since the start of the recording
+    kind: str
+    index: int
+    pos_index: int
+    increase: bool
+    middle_click: bool
+    steps: int = 1  # missing from the recordings made before the input was coalesced
+
+
+class SessionRecorder:
+    """Records the actions of a tracker with their timestamps, starting from a snapshot of the tracker"""
+
+    def __init__(self, config: Config):
+        self.config = config
+        self.actions: list[RecordedAction] = []
+
+        self.state = State(self.config)
+        self.state.get_states_from_labels()
+        self.start = time.perf_counter()
+
+    def record(self, action: Action):
+        self.actions.append(
+            RecordedAction(
+                time.perf_counter() - self.start,
+                action.kind.value,
+                action.index,
+                action.pos_index,
+                action.increase,
+                action.middle_click,
+                action.steps,
+            )
+        )
+
+    def record_history(self, kind: str):
+        self.actions.append(RecordedAction(time.perf_counter() - self.start, kind, -1, -1, False, False))
+
+    def save(self, path: Path):
+        with path.open("w") as file:
+            header = {
+                "version": RECORDING_VERSION,
+                "fingerprint": self.config.fingerprint,
+                "inventory": self.config.active_inv.index,
+                "state": self.state.to_json(),
+            }
+            file.write(json.dumps(header, separators=(",", ":")) + "\n")
+
+            for a in self.actions:
+                record = [round(a.time, 4), a.kind, a.index, a.pos_index, a.increase, a.middle_click, a.steps]
+                file.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+
+class Recording:
+    """A recording loaded from a file"""
+
+    def __init__(self, path: Path):
+        with path.open("r") as file:
+            self.header: dict = json.loads(file.readline())
+            self.actions = [RecordedAction(*json.loads(line)) for line in file if line.strip() != ""]
+
+    def is_compatible(self, config: Config):
+        return (
+            self.header.get("version") == RECORDING_VERSION
+            and self.header.get("fingerprint") == config.fingerprint
+            and self.header.get("inventory") == config.active_inv.index
+        )
+
+    def get_duration(self):
+        return self.actions[-1].time if len(self.actions) > 0 else 0.0
+
+
+class SessionPlayer(QObject):
+    """
+    Replays a recording through the tracker's action handlers, after restoring the snapshot it starts from.
+    ``speed`` is a multiplier of the recorded timings, 0 replays the actions as fast as possible.
+    """
+
+    finished = pyqtSignal()
+
+    def __init__(self, window: "TrackerWindow", recording: Recording, speed: float = 1.0):
+        super().__init__(window)
+
+        self.window = window
+        self.recording = recording
+        self.speed = speed
+        self.index = 0
+        self.start = 0.0
+        self.timer: Optional[QTimer] = None
+
+    def restore_snapshot(self):
+        # the recording starts with an empty history so undo and redo replay the same entries
+        state = State(self.window.config)
+        state.get_states_from_json(self.recording.header["state"])
+        self.window.apply_state(state)
+        self.window.history.clear()
+
+    def play_action(self, recorded: RecordedAction):
+        if recorded.kind == RECORD_UNDO:
+            self.window.edit_undo_triggered()
+        elif recorded.kind == RECORD_REDO:
+            self.window.edit_redo_triggered()
+        else:
+            self.window.perform_action(
+                Action(
+                    ActionKind(recorded.kind),
+                    recorded.index,
+                    recorded.pos_index,
+                    recorded.increase,
+                    recorded.middle_click,
+                    recorded.steps,
+                )
+            )
+
+    def start_playback(self):
+        """Starts the replay in the background of the event loop, ``finished`` is emitted at the end"""
+
+        self.restore_snapshot()
+        self.index = 0
+        self.start = time.perf_counter()
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.timer_timeout)
+        self.schedule_next()
+
+    def stop_playback(self):
+        if self.timer is not None:
+            self.timer.stop()
+            self.timer = None
+
+    def schedule_next(self):
+        if self.index >= len(self.recording.actions):
+            self.stop_playback()
+            self.finished.emit()
+            return
+
+        due = self.recording.actions[self.index].time / self.speed if self.speed > 0 else 0.0
+        self.timer.start(max(0, int((due - (time.perf_counter() - self.start)) * 1000)))
+
+    def timer_timeout(self):
+        # play every action that is due, in case the event loop was late
+        elapsed = time.perf_counter() - self.start
+
+        while self.index < len(self.recording.actions):
+            recorded = self.recording.actions[self.index]
+
+            if self.speed > 0 and recorded.time / self.speed > elapsed:
+                break
+
+            self.play_action(recorded)
+            self.index += 1
+
+        self.schedule_next()
+
+    def run_fast(self):
+        """
+        Replays every action synchronously, processing the events (repaints) after each one,
+        returns the number of actions per second and the mean latency of an action in milliseconds
+        """
+
+        self.restore_snapshot()
+        QApplication.processEvents()
+        latencies: list[float] = []
+
+        for recorded in self.recording.actions:
+            start = time.perf_counter()
+            self.play_action(recorded)
+            QApplication.processEvents()
+            latencies.append(time.perf_counter() - start)
+
+        total = sum(latencies)
+        actions_per_second = len(latencies) / total if total > 0 else 0.0
+        mean_latency = total / len(latencies) * 1000 if len(latencies) > 0 else 0.0
+        return actions_per_second, mean_latency
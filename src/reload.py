@@ -0,0 +1,434 @@
+import os
+import time
+import zlib
+
+from dataclasses import fields, replace
+from pathlib import Path
+from typing import TYPE_CHECKING
+from zipfile import ZipFile
+
+from PyQt6.QtCore import QRect, QSize
+from PyQt6.QtWidgets import QFrame, QLabel
+
+from common import OutlinedLabel, Label, show_error, GLOBAL_HALF_OPACITY
+from config import Config, Counter, Inventory, InventoryItem
+from state import State
+from profiler import profiled
+
+if TYPE_CHECKING:
+    from tracker import TrackerWindow
+
+
+# the fields compared to find the items that changed, the reward labels are created by the tracker
+ITEM_FIELDS = [field.name for field in fields(InventoryItem) if field.name != "reward_map"]
+COUNTER_FIELDS = [field.name for field in fields(Counter)]
+
+
+def extract_changed(zip_path: Path, folder: Path):
+    """Extracts the files of the zip that differ from the extracted ones, the others keep their modification time"""
+
+    with ZipFile(zip_path, "r") as zip_file:
+        for info in zip_file.infolist():
+            path = folder / info.filename
+
+            if info.is_dir():
+                continue
+
+            if path.exists() and path.stat().st_size == info.file_size and zlib.crc32(path.read_bytes()) == info.CRC:
+                continue
+
+            zip_file.extract(info, folder)
+
+
+def get_item_layout(item: InventoryItem):
+    """What the labels of an item are made of, an item with a different layout has its labels created again"""
+
+    return (
+        item.name,
+        len(item.positions),
+        len(item.paths),
+        item.counter is None,
+        item.is_reward,
+        item.flag_index is None,
+        item.extra_index is None,
+        item.scale_content,
+    )
+
+
+def get_moved_items(items: list[InventoryItem], new_items: list[InventoryItem]):
+    """
+    Returns the new index of each item that is still in the inventory, found by its name (the items with the same
+    name are matched in their order), the items after an added or a removed one are moved
+    """
+
+    new_indices: dict[str, list[int]] = {}
+
+    for index, item in enumerate(new_items):
+        new_indices.setdefault(item.name, []).append(index)
+
+    moved: dict[int, int] = {}
+    seen: dict[str, int] = {}
+
+    for index, item in enumerate(items):
+        occurrence = seen.get(item.name, 0)
+        seen[item.name] = occurrence + 1
+
+        if occurrence < len(new_indices.get(item.name, [])):
+            moved[index] = new_indices[item.name][occurrence]
+
+    return moved
+
+
+class ConfigReload:
+    """
+    Applies the changes of the config's file to a running tracker: the file is parsed again and compared to the
+    tracker's config, only the labels of what changed are updated and every other label keeps its state.
+    The inventories whose items were added, removed or changed their layout (see ``get_item_layout``)
+    have their labels created again, the state of the items that still exist is kept.
+    """
+
+    def __init__(self, window: "TrackerWindow"):
+        self.window = window
+        self.config = window.config
+        self.updated = 0
+        self.rebuilt: list[Inventory] = []
+
+    def parse(self):
+        """Returns the config as it is in the file now, or None if it can't be used"""
+
+        if self.config.source_path.suffix == ".zip":
+            extract_changed(self.config.source_path, self.config.config_dir)
+
+        try:
+            config = Config(self.config.widget, self.config.config_path, self.config.active_inv.index, False)
+        except Exception as e:
+            show_error(self.window, f"ERROR: the config can't be reloaded ({e})")
+            return None
+
+        if config.inventories.keys() != self.config.inventories.keys():
+            show_error(self.window, "ERROR: inventories were added or removed, the tracker needs to be opened again")
+            return None
+
+        return config
+
+    @profiled
+    def apply(self):
+        """Updates the tracker, returns False if the config couldn't be reloaded"""
+
+        start = time.perf_counter()
+        new_config = self.parse()
+
+        if new_config is None:
+            return False
+
+        changed_images = self.config.pop_changed_images()
+        changed_flags = set(
+            i for i, flag in enumerate(new_config.flags) if i >= len(self.config.flags) or flag != self.config.flags[i]
+        )
+        changed_extras = self.get_changed_extras(new_config, changed_images)
+        restyle = new_config.fonts != self.config.fonts or new_config.text_settings != self.config.text_settings
+
+        registered = set(font.path for font in self.config.fonts)
+
+        for font in new_config.fonts:
+            if font.path not in registered:
+                self.config.register_font(font)
+
+        self.config.fonts = new_config.fonts
+        self.config.text_settings = new_config.text_settings
+        self.config.flags = new_config.flags
+        self.config.extras = new_config.extras
+
+        self.window.centralwidget.setUpdatesEnabled(False)
+
+        try:
+            if restyle:
+                for label in self.window.centralwidget.findChildren(OutlinedLabel):
+                    self.restyle_label(label)
+
+            self.update_gomode(new_config, changed_images)
+
+            for index, inventory in self.config.inventories.items():
+                self.update_inventory(
+                    inventory, new_config.inventories[index], changed_images, changed_flags, changed_extras
+                )
+        finally:
+            self.window.centralwidget.setUpdatesEnabled(True)
+
+        self.config.fingerprint = self.config.get_fingerprint()
+        self.window.show_view(self.window.views[self.config.active_inv.index])
+
+        print(
+            f"INFO: reloaded the config in {(time.perf_counter() - start) * 1000:.2f} ms "
+            + f"({self.updated} labels updated, {len(self.rebuilt)} inventories created again)"
+        )
+
+        return True
+
+    def get_changed_extras(self, new_config: Config, changed_images: set[Path]):
+        if new_config.extras is None:
+            return set()
+
+        old_items = self.config.extras.items if self.config.extras is not None else []
+
+        return set(
+            i
+            for i, extra in enumerate(new_config.extras.items)
+            if i >= len(old_items) or extra != old_items[i] or extra.path in changed_images
+        )
+
+    def restyle_label(self, label: OutlinedLabel):
+        # the style is cached by the label, the same style has to be set again to use the new settings
+        if label.text_style is not None:
+            text_style = label.text_style
+            label.text_style = None
+            label.set_text_style(*text_style)
+
+    def update_pixmap(self, label: Label, path: Path, hidden_opacity: float = GLOBAL_HALF_OPACITY):
+        label.original_pixmap = self.config.get_pixmap(path)
+        label.setPixmap(label.original_pixmap)
+
+        if label.label_effect is not None and label.label_effect.strength() > 0.0:
+            label.set_pixmap_opacity(hidden_opacity)
+
+    def update_gomode(self, new_config: Config, changed_images: set[Path]):
+        settings = self.config.gomode_settings
+        paths = [settings.path, settings.light_path] if settings is not None else []
+
+        if new_config.gomode_settings == settings and not any(path in changed_images for path in paths):
+            return
+
+        # the go mode's labels are created again with their current state
+        state = State(self.config)
+        state.get_gomode_state()
+        self.window.stop_rotation()
+
+        if self.config.label_gomode is not None:
+            self.config.label_gomode.deleteLater()
+            self.config.label_gomode = None
+
+        if self.config.label_gomode_light is not None:
+            self.config.label_gomode_light.deleteLater()
+            self.config.label_gomode_light = None
+
+        self.config.gomode_settings = new_config.gomode_settings
+        self.window.create_gomode()
+
+        if self.config.label_gomode is not None:
+            # applying the state isn't a change of the progress
+            state_saved = self.config.state_saved
+            self.config.label_gomode.show()
+            state.apply_gomode_state()
+            self.config.state_saved = state_saved
+            self.window.start_rotation()
+
+        self.updated += 1
+
+    def update_inventory(
+        self,
+        inventory: Inventory,
+        new_inventory: Inventory,
+        changed_images: set[Path],
+        changed_flags: set[int],
+        changed_extras: set[int],
+    ):
+        if [get_item_layout(item) for item in inventory.items] != [
+            get_item_layout(item) for item in new_inventory.items
+        ]:
+            self.rebuild_inventory(inventory, new_inventory)
+            return
+
+        for action in self.window.inventory_actions.actions():
+            if action.data() == inventory.index:
+                action.setText(new_inventory.name)
+
+        inventory.name = new_inventory.name
+
+        if (
+            inventory.background != new_inventory.background
+            or inventory.background_color != new_inventory.background_color
+            or inventory.background in changed_images
+        ):
+            inventory.background = new_inventory.background
+            inventory.background_color = new_inventory.background_color
+            self.update_background(inventory)
+
+        changed_rewards = inventory.rewards.items != new_inventory.rewards.items
+        inventory.rewards.items = new_inventory.rewards.items
+
+        for item, new_item in zip(inventory.items, new_inventory.items):
+            if (
+                any(getattr(item, name) != getattr(new_item, name) for name in ITEM_FIELDS)
+                or any(path in changed_images for path in item.paths)
+                or (item.flag_index is not None and item.flag_index in changed_flags)
+                or (item.extra_index is not None and item.extra_index in changed_extras)
+                or (item.is_reward and changed_rewards)
+            ):
+                self.update_item(inventory, item, new_item)
+
+    def update_background(self, inventory: Inventory):
+        view = self.window.views.get(inventory.index)
+
+        if view is None:
+            return
+
+        width, height = self.config.get_image_size(inventory.background)
+        color = inventory.background_color
+        bg = view.widget.findChild(QFrame, "bg")
+        bg_label = bg.findChild(QLabel, "bg_label")
+
+        view.widget.setGeometry(QRect(0, 0, width, height))
+        bg.setGeometry(QRect(0, 0, width, height))
+        bg.setMinimumSize(QSize(width, height))
+        bg.setMaximumSize(QSize(width, height))
+        bg.setStyleSheet(f"background-color: rgb({color.r}, {color.g}, {color.b});")
+        bg_label.setGeometry(QRect(0, 0, width, height))
+        bg_label.setPixmap(self.config.get_pixmap(inventory.background))
+        self.updated += 1
+
+    def update_item(self, inventory: Inventory, item: InventoryItem, new_item: InventoryItem):
+        # the item and its counter are kept, the labels and the history refer to them
+        for name in ITEM_FIELDS:
+            if name != "counter":
+                setattr(item, name, getattr(new_item, name))
+
+        if item.counter is not None:
+            for name in COUNTER_FIELDS:
+                setattr(item.counter, name, getattr(new_item.counter, name))
+
+            item.counter.value = min(max(item.counter.value, item.counter.min), item.counter.max)
+
+        for label in inventory.label_map.get(item.index, {}).values():
+            self.update_label(inventory, item, label)
+
+    def update_label(self, inventory: Inventory, item: InventoryItem, label: Label):
+        offset = -1 if os.name == "nt" else 0
+        item_pos = item.positions[label.label_id.pos]
+
+        if item.scale_content:
+            width = 32
+            height = 32
+        else:
+            width, height = self.config.get_image_size(item.paths[0])
+
+        label.setGeometry(QRect(item_pos.x + offset, item_pos.y + offset, width, height))
+        self.update_pixmap(label, item.paths[max(label.img_index, 0)])
+        x, y = label.x(), label.y()
+
+        if label.label_counter is not None:
+            counter = item.counter
+            label.label_counter.setGeometry(QRect(x + counter.pos.x, y + counter.pos.y, counter.width, counter.height))
+
+            if counter.show:
+                label.label_counter.setText(f"{counter.value}")
+                label.label_counter.set_text_style(counter.text_settings_index, counter.value == counter.max)
+
+        if label.label_flag is not None:
+            flag = self.config.flags[item.flag_index]
+            total = len(flag.texts) - 1
+            label.flag_text_index = min(label.flag_text_index, total)
+
+            label.label_flag.setGeometry(QRect(x + flag.pos.x, y + flag.pos.y, flag.width, flag.height))
+            label.label_flag.setText(flag.texts[label.flag_text_index])
+            label.label_flag.set_text_style(
+                flag.text_settings_index, False if item.is_reward else label.flag_text_index == total
+            )
+
+        if label.label_extra_img is not None:
+            extra = self.config.extras.items[item.extra_index]
+            width, height = self.config.get_image_size(extra.path)
+
+            label.label_extra_img.setGeometry(QRect(x + extra.pos.x, y + extra.pos.y, width, height))
+            self.update_pixmap(label.label_extra_img, extra.path)
+
+        reward = item.reward_map.get(label.label_id.pos)
+        if reward is not None:
+            label.reward_index = min(label.reward_index, len(inventory.rewards.items) - 1)
+            reward_info = inventory.rewards.items[label.reward_index]
+            reward.set_text_style(reward_info.text_settings_index, False)
+            item.update_reward(label, reward_info)
+
+        self.updated += 1
+
+    def get_kept_states(self, state: State, inventory: Inventory, moved: dict[int, int]):
+        """
+        Returns the label states of the items that are still in the inventory (``moved``, see ``get_moved_items``)
+        at their new index, adjusted to the item's new layout (its images, counter, flag, extra image and rewards)
+        """
+
+        kept_states = []
+
+        for label_state in state.states:
+            index = moved.get(label_state.index)
+
+            if index is None:
+                continue
+
+            item = inventory.items[index]
+
+            if item.name != label_state.name or not (0 <= label_state.pos_index < len(item.positions)):
+                continue
+
+            label_state = replace(label_state, index=index, img_index=min(label_state.img_index, len(item.paths) - 1))
+
+            if item.counter is not None:
+                counter = item.counter
+                label_state.counter_value = min(max(label_state.counter_value, counter.min), counter.max)
+
+            if item.is_reward:
+                label_state.reward_index = max(min(label_state.reward_index, len(inventory.rewards.items) - 1), 0)
+
+            # the item's flag comes from the config, the state of a flag that was removed is dropped
+            label_state.flag_index = item.flag_index
+
+            if item.flag_index is not None:
+                total = len(self.config.flags[item.flag_index].texts) - 1
+                label_state.flag_text_index = min(label_state.flag_text_index, total)
+            else:
+                label_state.flag_text_index = 0
+                label_state.show_flag = False
+
+            if item.extra_index is None:
+                label_state.show_extra_img = False
+
+            kept_states.append(label_state)
+
+        return kept_states
+
+    def rebuild_inventory(self, inventory: Inventory, new_inventory: Inventory):
+        view = self.window.views.get(inventory.index)
+        shown = self.config.active_inv
+        self.config.active_inv = inventory
+
+        if view is not None:
+            state = State(self.config)
+            state.get_states_from_labels()
+        else:
+            state = self.window.saved_states.get(inventory.index)
+
+        moved = get_moved_items(inventory.items, new_inventory.items)
+
+        # the parsed inventory replaces the current one, the config's other references to it are kept
+        inventory.name = new_inventory.name
+        inventory.background = new_inventory.background
+        inventory.background_color = new_inventory.background_color
+        inventory.items = new_inventory.items
+        inventory.rewards = new_inventory.rewards
+        inventory.label_map = {}
+
+        if state is not None:
+            state.states = self.get_kept_states(state, inventory, moved)
+
+        if view is not None:
+            new_view = self.window.create_view()
+            self.window.views[inventory.index] = new_view
+            state.apply()
+
+            if inventory is not shown:
+                new_view.widget.hide()
+
+            # the previous labels are deleted once the new ones have the kept states
+            view.widget.deleteLater()
+
+        self.config.active_inv = shown
+        self.rebuilt.append(inventory)
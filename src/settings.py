@@ -0,0 +1,68 @@
+import os
+import json
+import tempfile
+
+from dataclasses import dataclass, asdict, fields
+from pathlib import Path
+from typing import Optional
+
+SETTINGS_PATH = Path("settings.json").resolve()
+SETTINGS_VERSION = 1
+
+
+@dataclass
+class Settings:
+    """The program's settings, remembers the last opened tracker to resume it on the next launch"""
+
+    version: int = SETTINGS_VERSION
+    config_dir: Optional[str] = None
+    # the config file or the zip archive that was opened
+    config_path: Optional[str] = None
+    fingerprint: Optional[str] = None
+    inventory: Optional[int] = None
+    state_path: Optional[str] = None
+    window_pos: Optional[tuple[int, int]] = None
+    resume_on_launch: bool = False
+
+    def can_resume(self):
+        return self.resume_on_launch and self.config_path is not None and Path(self.config_path).exists()
+
+    @staticmethod
+    def load(path: Path = SETTINGS_PATH):
+        """Returns the saved settings, or the default ones if the file is missing or unreadable"""
+
+        if not path.exists():
+            return Settings()
+
+        try:
+            data = json.loads(path.read_text())
+        except (OSError, ValueError):
+            print(f"WARNING: '{path}' can't be read, using the default settings")
+            return Settings()
+
+        if not isinstance(data, dict) or data.get("version") != SETTINGS_VERSION:
+            print(f"WARNING: unsupported settings version in '{path}', using the default settings")
+            return Settings()
+
+        names = set(field.name for field in fields(Settings))
+        settings = Settings(**{key: value for key, value in data.items() if key in names})
+
+        if settings.window_pos is not None:
+            settings.window_pos = tuple(settings.window_pos)
+
+        return settings
+
+    def save(self, path: Path = SETTINGS_PATH):
+        # a temporary file of its own, several trackers may save the settings at the same time
+        fd, temp_path = tempfile.mkstemp(prefix=f"{path.name}.", suffix=".tmp", dir=path.parent)
+
+        try:
+            with os.fdopen(fd, "w") as file:
+                json.dump(asdict(self), file, indent=4)
+                file.flush()
+                os.fsync(file.fileno())
+
+            os.replace(temp_path, path)
+        except BaseException:
+            Path(temp_path).unlink(missing_ok=True)
+            raise
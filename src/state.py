@@ -1,14 +1,49 @@
-from dataclasses import dataclass
-from typing import Optional
+import os
+import json
+import hashlib
+import tempfile
+
+from dataclasses import dataclass, astuple, fields
+from enum import Enum
+from typing import Optional, TextIO
 from pathlib import Path
 
-from PyQt6.QtGui import QPixmap
+from PyQt6.QtCore import QThread, pyqtSignal
 
 from config import Config
-from common import show_error, GLOBAL_HALF_OPACITY
+from common import Label, LabelId, show_error, GLOBAL_HALF_OPACITY
+from profiler import profiled
 
 
 WARNING_TEXT = "!" * 63 + "\n!!! WARNING: DO NOT EDIT UNLESS YOU KNOW WHAT YOU ARE DOING !!!\n" + "!" * 63 + "\n\n"
+JOURNAL_DIR = Path("journal/").resolve()
+STATE_VERSION = 1
+CHECKSUM_PREFIX = "# sha256: "
+
+
+class ActionKind(Enum):
+    TOGGLE = "toggle"
+    PROGRESSIVE = "progressive"
+    COUNTER = "counter"
+    REWARD = "reward"
+    FLAG = "flag"
+    EXTRA = "extra"
+    GOMODE = "gomode"
+
+
+@dataclass
+class Action:
+    """
+    A single logical tracker action, the go mode uses -1 as the item and position indices.
+    ``steps`` is the number of times the action is repeated, the input coalesced over a frame (see ``InputCoalescer``)
+    """
+
+    kind: ActionKind
+    index: int
+    pos_index: int
+    increase: bool = True
+    middle_click: bool = False
+    steps: int = 1
 
 
 @dataclass
@@ -27,51 +62,152 @@ class LabelState:
     show_extra_img: bool
 
 
+# the columns of the json format, the name is omitted since the config's fingerprint is checked instead
+STATE_COLUMNS = [field.name for field in fields(LabelState) if field.name != "name"]
+
+
+class StateBackend:
+    """Storage of a state, ``read`` fills the state's data (returns False if it can't be used) and ``write`` stores it"""
+
+    def read(self, state: "State") -> bool:
+        raise NotImplementedError
+
+    def write(self, state: "State"):
+        raise NotImplementedError
+
+
+class FileBackend(StateBackend):
+    """Text or json state file, depending on the file's extension"""
+
+    def get_backup_path(self, path: Path):
+        return path.with_name(f"{path.name}.bak")
+
+    def read_file(self, path: Path):
+        """Returns the content of the file without its checksum, or None if it's missing or corrupted"""
+
+        if not path.exists():
+            return None
+
+        with path.open("r") as file:
+            filedata = file.read()
+
+        data, separator, checksum = filedata.rpartition(f"\n{CHECKSUM_PREFIX}")
+
+        # files written before checksums were introduced can't be verified
+        if separator == "":
+            return filedata
+
+        if hashlib.sha256(data.encode()).hexdigest() != checksum.strip():
+            print(f"WARNING: the checksum of '{path}' doesn't match, the file is corrupted")
+            return None
+
+        return data
+
+    def read(self, state: "State"):
+        if state.path is None:
+            show_error(state.config.widget, "ERROR: import path not set")
+            return False
+
+        filedata = self.read_file(state.path)
+
+        if filedata is None:
+            filedata = self.read_file(self.get_backup_path(state.path))
+
+            if filedata is None:
+                show_error(state.config.widget, f"ERROR: the state file '{state.path}' is missing or corrupted")
+                return False
+
+            print(f"WARNING: '{state.path}' can't be used, loading the previous save instead")
+
+        if state.path.suffix == ".json":
+            return state.get_states_from_json(filedata)
+
+        try:
+            state.get_states_from_file(filedata.removeprefix(WARNING_TEXT).split("\n"))
+        except (ValueError, IndexError) as e:
+            show_error(state.config.widget, f"ERROR: the state file '{state.path}' can't be read ({e})")
+            return False
+
+        return state.check_states(state.states)
+
+    def write(self, state: "State"):
+        """Writes the state to a temporary file then replaces the current file, which is kept as a backup"""
+
+        if state.path is None:
+            show_error(state.config.widget, "ERROR: export path not set")
+            return
+
+        data = state.to_json() if state.path.suffix == ".json" else state.to_text()
+        # a temporary file of its own, the autosave thread may be writing the same state file
+        fd, temp_path = tempfile.mkstemp(prefix=f"{state.path.name}.", suffix=".tmp", dir=state.path.parent)
+
+        try:
+            with os.fdopen(fd, "w") as file:
+                file.write(f"{data}\n{CHECKSUM_PREFIX}{hashlib.sha256(data.encode()).hexdigest()}\n")
+                file.flush()
+                os.fsync(file.fileno())
+
+            # the current file becomes the backup, unless another write just moved it
+            try:
+                os.replace(state.path, self.get_backup_path(state.path))
+            except FileNotFoundError:
+                pass
+
+            os.replace(temp_path, state.path)
+        except BaseException:
+            Path(temp_path).unlink(missing_ok=True)
+            raise
+
+
 class State:
-    def __init__(self, config: Config, path: Optional[Path] = None):
+    def __init__(self, config: Config, path: Optional[Path] = None, backend: Optional[StateBackend] = None):
         self.config = config
         self.states: list[LabelState] = []
         self.gomode_visibility = False
         self.gomode_light_visibility = False
+        self.backend = backend if backend is not None else FileBackend()
 
         if path is not None:
             self.path = path
         else:
             self.path = self.config.state_path
 
-        if not self.path.suffix == ".txt":
-            self.path = self.path / ".txt"
-
-    def get_states_from_labels(self):
-        gomodefx = self.config.label_gomode.label_effect
-
-        if gomodefx is not None:
-            self.gomode_visibility = gomodefx.strength() == 0.0
+        if self.path is not None and self.path.suffix not in {".txt", ".json"}:
+            self.path = self.path.with_suffix(".json")
+
+    def get_label_state(self, label: Label):
+        item = self.config.active_inv.items[label.label_id.item]
+
+        return LabelState(
+            label.label_id.item,
+            label.label_id.pos,
+            item.name,
+            label.img_index,
+            (item.counter.value if item.counter is not None else 0),
+            (item.counter.show if item.counter is not None else False),
+            label.label_effect.strength() == 0.0 if label.label_effect is not None else False,
+            label.reward_index,
+            item.flag_index,
+            label.flag_text_index,
+            not label.label_flag.isHidden() if label.label_flag is not None else False,
+            not label.label_extra_img.isHidden() if label.label_extra_img is not None else False,
+        )
+
+    def get_gomode_state(self):
+        if self.config.label_gomode is not None and self.config.label_gomode.label_effect is not None:
+            self.gomode_visibility = self.config.label_gomode.label_effect.strength() == 0.0
 
         if self.config.label_gomode_light is not None:
-            self.gomode_light_visibility = self.config.label_gomode_light.isVisible()
+            self.gomode_light_visibility = not self.config.label_gomode_light.isHidden()
         else:
             self.gomode_light_visibility = False
 
-        for index, sub_map in self.config.active_inv.label_map.items():
-            for i, label in sub_map.items():
-                item = self.config.active_inv.items[index]
-                self.states.append(
-                    LabelState(
-                        index,
-                        i,
-                        item.name,
-                        label.img_index,
-                        (item.counter.value if item.counter is not None else 0),
-                        (item.counter.show if item.counter is not None else False),
-                        label.label_effect.strength() == 0.0 if label.label_effect is not None else False,
-                        label.reward_index,
-                        item.flag_index,
-                        label.flag_text_index,
-                        label.label_flag.isVisible() if label.label_flag is not None else False,
-                        label.label_extra_img.isVisible() if label.label_extra_img is not None else False,
-                    )
-                )
+    def get_states_from_labels(self):
+        self.get_gomode_state()
+
+        for sub_map in self.config.active_inv.label_map.values():
+            for label in sub_map.values():
+                self.states.append(self.get_label_state(label))
 
     def get_states_from_file(self, filedata: str):
         new_state = None
@@ -127,118 +263,358 @@ class State:
                         elif line.startswith("show_extra_img"):
                             new_state.show_extra_img = True if value == "True" else False
 
-    def open(self):
-        if self.path is None:
-            show_error("ERROR: import path not set")
+    def is_valid(self, state: LabelState):
+        """Returns True if the label state can be applied to the inventory's items"""
+
+        items = self.config.active_inv.items
+
+        if not (0 <= state.index < len(items)):
+            return False
+
+        item = items[state.index]
+        return (
+            item.name == state.name
+            and 0 <= state.pos_index < len(item.positions)
+            and -1 <= state.img_index < len(item.paths)
+            and (
+                state.flag_index is None
+                or (
+                    0 <= state.flag_index < len(self.config.flags)
+                    and 0 <= state.flag_text_index < len(self.config.flags[state.flag_index].texts)
+                )
+            )
+            and (not item.is_reward or 0 <= state.reward_index < len(self.config.active_inv.rewards.items))
+        )
 
-        with self.path.open("r") as file:
-            filedata = file.read().removeprefix(WARNING_TEXT).split("\n")
+    def check_states(self, states: list[LabelState]):
+        """Returns False if one of the label states can't be applied, the tracker isn't updated partially"""
 
-        self.get_states_from_file(filedata)
+        for state in states:
+            if not self.is_valid(state):
+                show_error(self.config.widget, f"ERROR: the state of '{state.name}' doesn't match the configuration")
+                return False
 
-        self.config.label_gomode.update_gomode(self.gomode_visibility)
+        return True
+
+    def apply_gomode_state(self):
+        if self.config.label_gomode is not None:
+            self.config.label_gomode.update_gomode(self.gomode_visibility)
 
         if self.config.label_gomode_light is not None:
             self.config.label_gomode_light.setVisible(self.gomode_light_visibility)
 
-        for state in self.states:
-            item = self.config.active_inv.items[state.index]
-            label = None
+    def apply_label_state(self, state: LabelState):
+        item = self.config.active_inv.items[state.index]
+        label = self.config.active_inv.get_label(LabelId(self.config.active_inv.index, state.index, state.pos_index))
 
-            for i, _ in enumerate(item.positions):
-                if i == state.pos_index:
-                    label = self.config.active_inv.label_map[state.index][i]
-                    break
-                else:
-                    label = None
+        if label is not None:
+            if label.name != state.name:
+                print(f"WARNING: name mismatch! ignoring the current label... ('{label.name}', '{state.name}')")
+                return
 
-            if label is not None:
-                if label.name != state.name:
-                    print(f"WARNING: name mismatch! ignoring the current label... ('{label.name}', '{state.name}')")
-                    continue
+            if item.counter is not None:
+                item.counter.value = state.counter_value
+                item.counter.show = state.counter_show
 
-                if item.counter is not None:
-                    item.counter.value = state.counter_value
-                    item.counter.show = state.counter_show
+                if item.counter.value % item.counter.increment:
+                    print("WARNING: the counter's value doesn't match how it's incremented")
 
-                    if item.counter.value % item.counter.increment:
-                        print("WARNING: the counter's value doesn't match how it's incremented")
-
-                    if item.counter.show:
-                        label.label_counter.setText(f"{item.counter.value}")
-                        label.label_counter.set_text_style(
-                            item.counter.text_settings_index, item.counter.value == item.counter.max
-                        )
+                if item.counter.show:
+                    label.get_counter().setText(f"{item.counter.value}")
+                    label.label_counter.set_text_style(
+                        item.counter.text_settings_index, item.counter.value == item.counter.max
+                    )
+                elif label.label_counter is not None:
+                    label.label_counter.setText("")
 
-                if state.img_index < 0:
-                    path_index = 0
-                else:
-                    path_index = state.img_index
+            if state.img_index < 0:
+                path_index = 0
+            else:
+                path_index = state.img_index
 
+            # the pixmap only needs to be updated if the image or the filter changes
+            enabled = label.label_effect is not None and label.label_effect.strength() == 0.0
+            if label.img_index != state.img_index or enabled != state.enabled:
                 label.img_index = state.img_index
-                label.original_pixmap = QPixmap(str(item.paths[path_index]))
+                label.original_pixmap = self.config.get_pixmap(item.paths[path_index])
                 label.setPixmap(label.original_pixmap)
                 if not state.enabled:
                     label.set_pixmap_opacity(GLOBAL_HALF_OPACITY)
 
-                if item.is_reward:
-                    label.reward_index = state.reward_index
-                    for i, _ in enumerate(item.positions):
-                        if label.objectName().endswith(f"_pos_{i}"):
-                            reward = item.reward_map[i]
+            if item.is_reward and label.reward_index != state.reward_index:
+                label.reward_index = state.reward_index
+                reward = item.reward_map.get(state.pos_index)
 
-                            if reward is not None and reward.item_label is not None:
-                                item.update_reward(i, self.config.active_inv.rewards.items[label.reward_index])
+                if reward is not None and reward.item_label is not None:
+                    item.update_reward(label, self.config.active_inv.rewards.items[label.reward_index])
 
-                if label.label_effect is not None:
-                    label.label_effect.setStrength(0.0 if state.enabled else 1.0)
+            if label.label_effect is not None:
+                label.label_effect.setStrength(0.0 if state.enabled else 1.0)
 
-                item.flag_index = state.flag_index
-                label.flag_text_index = state.flag_text_index
+            item.flag_index = state.flag_index
+            label.flag_text_index = state.flag_text_index
 
-                if item.flag_index is not None and label.label_flag is not None:
-                    flag = self.config.flags[item.flag_index]
-                    total = len(flag.texts) - 1
-                    is_max = False if item.is_reward else label.flag_text_index == total
+            # the hidden overlays that were never shown don't need to be created
+            if label.has_flag() and (state.show_flag or label.label_flag is not None):
+                flag = self.config.flags[item.flag_index]
+                total = len(flag.texts) - 1
+                is_max = False if item.is_reward else label.flag_text_index == total
 
-                    label.label_flag.setText(flag.texts[label.flag_text_index])
-                    label.label_flag.set_text_style(flag.text_settings_index, is_max)
-                    label.label_flag.setVisible(state.show_flag)
+                label.get_flag().setText(flag.texts[label.flag_text_index])
+                label.label_flag.set_text_style(flag.text_settings_index, is_max)
+                label.label_flag.setVisible(state.show_flag)
 
-                if label.label_extra_img is not None:
-                    label.label_extra_img.setVisible(state.show_extra_img)
+            if label.has_extra_img() and (state.show_extra_img or label.label_extra_img is not None):
+                label.get_extra_img().setVisible(state.show_extra_img)
 
-        self.config.state_saved = True
+    def get_states_from_json(self, filedata: str):
+        """Returns False if the state was saved with another version or another configuration"""
 
-    def save(self):
-        if self.path is None:
-            show_error("ERROR: export path not set")
+        try:
+            data = json.loads(filedata)
 
-        self.get_states_from_labels()
+            if data.get("version") != STATE_VERSION:
+                show_error(self.config.widget, f"ERROR: unsupported state version '{data.get('version')}'")
+                return False
 
-        with self.path.open("w") as file:
-            file.write(
-                WARNING_TEXT
-                + (
-                    "Global Settings:\n\t"
-                    + f"gomode_visibility = {self.gomode_visibility}\n\t"
-                    + f"gomode_light_visibility = {self.gomode_light_visibility}\n\n"
-                )
-                + "\n".join(
-                    f"Label #{s.index:02}:\n\t"
-                    + f"pos_index = {s.pos_index}\n\t"
-                    + f"name = '{s.name}'\n\t"
-                    + f"enabled = {s.enabled}\n\t"
-                    + f"img_index = {s.img_index}\n\t"
-                    + f"counter_value = {s.counter_value}\n\t"
-                    + f"counter_show = {s.counter_show}\n\t"
-                    + f"reward_index = {s.reward_index}\n\t"
-                    + f"flag_index = {s.flag_index}\n\t"
-                    + f"flag_text_index = {s.flag_text_index}\n\t"
-                    + f"show_flag = {s.show_flag}\n\t"
-                    + f"show_extra_img = {s.show_extra_img}\n"
-                    for s in self.states
-                )
+            if (
+                data.get("fingerprint") != self.config.fingerprint
+                or data.get("inventory") != self.config.active_inv.index
+            ):
+                show_error(self.config.widget, "ERROR: this state was saved with a different configuration")
+                return False
+
+            gomode_visibility, gomode_light_visibility = data["gomode"]
+
+            items = self.config.active_inv.items
+            labels = data["labels"]
+            states = [
+                LabelState(row[0], row[1], items[row[0]].name, *row[2:])
+                for row in zip(*(labels[column] for column in STATE_COLUMNS))
+            ]
+
+            if not self.check_states(states):
+                return False
+        except (ValueError, KeyError, TypeError, IndexError, AttributeError) as e:
+            show_error(self.config.widget, f"ERROR: the state can't be read ({e})")
+            return False
+
+        self.gomode_visibility, self.gomode_light_visibility = gomode_visibility, gomode_light_visibility
+        self.states.extend(states)
+        return True
+
+    def read(self):
+        return self.backend.read(self)
+
+    def get_container(self):
+        """Returns the widget hosting the labels"""
+
+        for sub_map in self.config.active_inv.label_map.values():
+            for label in sub_map.values():
+                return label.parentWidget()
+
+        return None
+
+    @profiled
+    def apply(self):
+        """Applies every state with the window's updates suspended, the window is repainted once at the end"""
+
+        container = self.get_container()
+
+        if container is not None:
+            container.setUpdatesEnabled(False)
+
+        try:
+            self.apply_gomode_state()
+
+            for state in self.states:
+                self.apply_label_state(state)
+        finally:
+            if container is not None:
+                container.setUpdatesEnabled(True)
+
+    @profiled
+    def open(self):
+        """Reads and applies the state, the tracker is left as it is if the state can't be used"""
+
+        if not self.read():
+            return False
+
+        self.apply()
+        self.config.state_saved = True
+        return True
+
+    def to_json(self):
+        return json.dumps(
+            {
+                "version": STATE_VERSION,
+                "fingerprint": self.config.fingerprint,
+                "inventory": self.config.active_inv.index,
+                "gomode": [self.gomode_visibility, self.gomode_light_visibility],
+                "labels": {column: [getattr(s, column) for s in self.states] for column in STATE_COLUMNS},
+            },
+            separators=(",", ":"),
+        )
+
+    def to_text(self):
+        return (
+            WARNING_TEXT
+            + (
+                "Global Settings:\n\t"
+                + f"gomode_visibility = {self.gomode_visibility}\n\t"
+                + f"gomode_light_visibility = {self.gomode_light_visibility}\n\n"
+            )
+            + "\n".join(
+                f"Label #{s.index:02}:\n\t"
+                + f"pos_index = {s.pos_index}\n\t"
+                + f"name = '{s.name}'\n\t"
+                + f"enabled = {s.enabled}\n\t"
+                + f"img_index = {s.img_index}\n\t"
+                + f"counter_value = {s.counter_value}\n\t"
+                + f"counter_show = {s.counter_show}\n\t"
+                + f"reward_index = {s.reward_index}\n\t"
+                + f"flag_index = {s.flag_index}\n\t"
+                + f"flag_text_index = {s.flag_text_index}\n\t"
+                + f"show_flag = {s.show_flag}\n\t"
+                + f"show_extra_img = {s.show_extra_img}\n"
+                for s in self.states
             )
+        )
 
+    def write(self):
+        self.backend.write(self)
+
+    @profiled
+    def save(self):
+        self.get_states_from_labels()
+        self.write()
         self.config.state_saved = True
+
+
+class StateWriterThread(QThread):
+    """Writes a state captured from the labels without blocking the window, optionally to other backends too"""
+
+    written = pyqtSignal(bool, str)
+
+    def __init__(self, state: State, mirrors: Optional[list[StateBackend]] = None):
+        super().__init__()
+        self.state = state
+        self.mirrors = mirrors if mirrors is not None else []
+
+    def run(self):
+        try:
+            self.state.write()
+
+            for backend in self.mirrors:
+                backend.write(self.state)
+
+            self.written.emit(True, str(self.state.path))
+        except Exception as e:
+            # the file, the database or the state's data, the window is told about any failure
+            self.written.emit(False, f"{self.state.path}: {e}")
+
+
+class StateJournal:
+    """Append-only log of the tracker's actions, folded periodically into a full snapshot"""
+
+    def __init__(self, config: Config, compact_every: int = 256):
+        self.config = config
+        self.compact_every = compact_every
+        self.count = 0
+        self.file: Optional[TextIO] = None
+
+        # one journal per config file and inventory, inventories of different configs can have the same name
+        name = "".join(c if c.isalnum() else "_" for c in self.config.active_inv.name)
+        key = f"{self.config.source_path.resolve()};{self.config.active_inv.index}"
+        name = f"{name}_{hashlib.sha1(key.encode()).hexdigest()[:12]}"
+        self.snapshot_path = JOURNAL_DIR / f"{name}.json"
+        self.path = JOURNAL_DIR / f"{name}.journal"
+        self.state = State(self.config, self.snapshot_path)
+
+    def start(self):
+        if not JOURNAL_DIR.exists():
+            JOURNAL_DIR.mkdir(parents=True, exist_ok=True)
+
+        self.compact()
+
+    def stop(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def clear(self):
+        self.stop()
+        self.path.unlink(missing_ok=True)
+        self.snapshot_path.unlink(missing_ok=True)
+
+    def append(self, action: Action, label: Optional[Label]):
+        if self.file is None:
+            return
+
+        record: dict = {"k": action.kind.value, "i": action.index, "p": action.pos_index}
+
+        if action.kind == ActionKind.GOMODE:
+            self.state.get_gomode_state()
+            record["g"] = [self.state.gomode_visibility, self.state.gomode_light_visibility]
+        elif label is not None:
+            record["s"] = astuple(self.state.get_label_state(label))
+
+        # flushing is enough to survive a crash of the program, the OS keeps the data
+        self.file.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self.file.flush()
+        self.count += 1
+
+        if self.count >= self.compact_every:
+            self.compact()
+
+    def compact(self):
+        """Writes a full snapshot of the tracker then truncates the journal"""
+
+        self.stop()
+
+        snapshot = State(self.config, self.snapshot_path)
+        snapshot.get_states_from_labels()
+        snapshot.write()
+
+        self.file = self.path.open("w")
+        self.count = 0
+
+    def restore(self):
+        """Replays the last snapshot and the journal, returns True if there was something to restore"""
+
+        if not self.snapshot_path.exists():
+            return False
+
+        snapshot = State(self.config, self.snapshot_path)
+
+        # the records follow the snapshot, they can't be replayed without it (for instance if the config changed)
+        if not snapshot.read():
+            return False
+
+        # only the latest state of each label matters, everything is applied at once
+        states = {(state.index, state.pos_index): state for state in snapshot.states}
+
+        if self.path.exists():
+            with self.path.open("r") as file:
+                for line in file:
+                    try:
+                        record = json.loads(line)
+
+                        if "g" in record:
+                            snapshot.gomode_visibility, snapshot.gomode_light_visibility = record["g"]
+                        elif "s" in record:
+                            state = LabelState(*record["s"])
+
+                            if not snapshot.is_valid(state):
+                                print("WARNING: ignoring a journal record that doesn't match the inventory")
+                                continue
+
+                            states[(state.index, state.pos_index)] = state
+                    except (ValueError, TypeError):
+                        # the last record can be truncated if the program crashed while writing it
+                        print("WARNING: ignoring a malformed journal record")
+
+        snapshot.states = list(states.values())
+        snapshot.apply()
+        self.config.state_saved = False
+        return True
@@ -2,12 +2,12 @@ import sys
 import os
 import time
 
+from collections import OrderedDict
 from datetime import datetime
 from pathlib import Path
 from typing import Optional
 
-from PIL import Image
-from PyQt6.QtGui import QIcon, QPixmap, QAction, QCloseEvent
+from PyQt6.QtGui import QIcon, QAction, QActionGroup, QCloseEvent, QKeySequence
 from PyQt6.QtCore import QSize, Qt, QRect, QThread
 from PyQt6.QtWidgets import (
     QWidget,
@@ -20,9 +20,36 @@ from PyQt6.QtWidgets import (
     QFileDialog,
 )
 
-from common import OutlinedLabel, Label, Rotation, RotationWidget, show_message, GLOBAL_HALF_OPACITY
-from config import Config, Pos
-from state import State
+from common import (
+    OutlinedLabel,
+    Label,
+    LabelId,
+    LabelDispatcher,
+    ListDialog,
+    TextDialog,
+    Rotation,
+    RotationWidget,
+    show_message,
+    show_error,
+    GLOBAL_HALF_OPACITY,
+)
+from config import Config, Inventory, Pos
+from state import State, StateJournal, StateWriterThread, Action, ActionKind
+from autosave import AutosaveStore
+from database import SessionDatabase, DatabaseBackend
+from history import History, HistoryEntry
+from recording import SessionRecorder, SessionPlayer, Recording, RECORD_UNDO, RECORD_REDO
+from profiler import PROFILER, ProfilerWindow, profiled, export_trace
+from diagnostics import MemoryAccounting, get_watchdog, get_memory_report
+from settings import Settings
+from reload import ConfigReload
+from coalescer import InputCoalescer
+
+
+STATE_FILE_FILTER = "State files (*.json *.txt)"
+RECORDING_FILE_FILTER = "Recordings (*.jsonl)"
+# number of inventories with their widgets kept while another inventory is shown
+MAX_INVENTORY_VIEWS = 4
 
 
 class AutosaveThread(QThread):
@@ -32,27 +59,39 @@ class AutosaveThread(QThread):
         self.setParent(parent)
         self.config = config
         self.run_ = False
+        self.database_backend: Optional[DatabaseBackend] = None
 
     def run(self):
         while self.run_:
-            # every 5 minutes
+            # every 5 minutes, stops within 100 ms once ``run_`` is unset
             # TODO: configurable time
-            time.sleep(5 * 60)
+            deadline = time.monotonic() + 5 * 60
+
+            while self.run_ and time.monotonic() < deadline:
+                self.msleep(100)
 
-            if self.config.autosave_enabled:
-                folder = Path("autosaves/").resolve()
-                if not folder.exists():
-                    folder.mkdir(parents=True, exist_ok=True)
+            if self.run_ and self.config.autosave_enabled:
+                state = State(self.config)
 
                 if self.config.state_path is None:
-                    now = datetime.now()
-                    filename = f"autosave_{now.strftime('%d-%m-%Y')}_{now.strftime('%H-%M-%S')}.txt"
-                    path = folder / filename
+                    state.get_states_from_labels()
+                    AutosaveStore(self.config).add(state)
                 else:
-                    path = self.config.state_path
+                    state.save()
 
-                state = State(self.config, path)
-                state.save()
+                if self.database_backend is not None:
+                    self.database_backend.write(state)
+
+
+class InventoryView:
+    """The widget hosting the background and the labels of an inventory, with the inventory's history"""
+
+    def __init__(self, inventory: Inventory, widget: QWidget, history: History, initial_state: State):
+        self.inventory = inventory
+        self.widget = widget
+        self.history = history
+        # the labels as they were created, to reset the tracker when it's reused (see ``TrackerPool``)
+        self.initial_state = initial_state
 
 
 class TrackerWindow(QMainWindow):
@@ -61,32 +100,111 @@ class TrackerWindow(QMainWindow):
 
         self.parent_ = parent
         self.config = config
-        self.bg_path = self.config.active_inv.background
+        # set if the window can be reused once it's closed (see ``TrackerPool``)
+        self.pool_key: Optional[tuple] = None
+
+        # the views of the inventories from the least recently shown to the shown one,
+        # the state of the inventories that were removed is kept to create them again
+        self.views: OrderedDict[int, InventoryView] = OrderedDict()
+        self.saved_states: dict[int, State] = {}
+        self.max_views = MAX_INVENTORY_VIEWS
 
         self.task_autosave = AutosaveThread(self, config)
-        self.task_autosave.start()
+        self.task_rotation: Optional[Rotation] = None
 
-        self.task_rotation = Rotation(self.config)
-        self.task_rotation.positionChanged.connect(self.task_rotation_position_changed)
-        self.task_rotation.start()
+        self.database: Optional[SessionDatabase] = None
+        self.database_backend: Optional[DatabaseBackend] = None
 
-        # get the background's size
-        width, height = Image.open(self.bg_path).size
+        # only one state is written at a time, the latest capture waits for the current write
+        self.task_save: Optional[StateWriterThread] = None
+        self.pending_save: Optional[State] = None
 
-        # create the window itself
-        self.create_window(width, height)
+        # the clicks and the wheel of every label go through the dispatcher, their actions are coalesced per frame
+        self.coalescer = InputCoalescer(self, self.perform_action)
+        self.dispatcher = LabelDispatcher(self)
+        self.dispatcher.clicked_left.connect(self.label_clicked_left)
+        self.dispatcher.clicked_middle.connect(self.label_clicked_middle)
+        self.dispatcher.clicked_right.connect(self.label_clicked_right)
+        self.dispatcher.scrolled.connect(self.label_scrolled)
 
-        # create the background image
-        self.create_background(width, height)
+        # create the window itself
+        self.create_window()
 
         # create the top menu bar
         self.create_menubar()
 
-        # create the necessary labels based on the config
-        self.create_labels()
+        # create the go mode's labels, shared by the inventories
+        self.create_gomode()
+
+        # the go mode as it was created, the views' initial state holds the go mode of the moment they were created
+        self.initial_gomode = State(self.config)
+        self.initial_gomode.get_gomode_state()
+
+        # create the background and the labels of the active inventory
+        view = self.create_view()
+        self.views[self.config.active_inv.index] = view
+        self.show_view(view)
+
+        self.recorder: Optional[SessionRecorder] = None
+        self.player: Optional[SessionPlayer] = None
+        self.profiler_window: Optional[ProfilerWindow] = None
+
+        # the journal of the active inventory, each inventory has its own
+        self.journal: Optional[StateJournal] = None
+        self.journals: dict[int, StateJournal] = {}
+
+        self.start_session()
+
+    def start_session(self):
+        """Starts the rotation and the storages enabled in the config, when the window is created or reused"""
+
+        self.start_rotation()
+
+        # restore the progress from the journal if the program didn't close properly
+        if self.config.journal_enabled:
+            self.action_journal.setChecked(True)
+            self.start_journal()
+
+        self.action_database.setChecked(self.config.database_enabled)
+        self.file_database_triggered()
+
+        self.action_resume.setChecked(Settings.load().resume_on_launch)
+
+    def reuse(self, config: Config):
+        """Resets the tracker to a new session of ``config``, the config this window was created from"""
+
+        for name in ["state_path", "state_saved", "autosave_enabled", "journal_enabled", "database_enabled"]:
+            setattr(self.config, name, getattr(config, name))
+
+        # every inventory goes back to its initial state, the removed views are created from scratch
+        shown = self.config.active_inv
+        self.saved_states.clear()
+
+        for inventory in self.config.inventories.values():
+            view = self.views.get(inventory.index)
+            self.config.active_inv = inventory
+
+            if view is not None:
+                self.apply_state(view.initial_state)
+                view.history.clear()
+            else:
+                for item in inventory.items:
+                    if item.counter is not None:
+                        item.counter.value = item.counter.min
+                        item.counter.show = False
+
+        self.config.active_inv = shown
+        self.initial_gomode.apply_gomode_state()
+        self.switch_inventory(config.active_inv.index)
+        self.config.state_saved = config.state_saved
+        self.action_autosave.setChecked(False)
+        self.action_journal.setChecked(False)
+        self.action_record.setChecked(False)
+        self.start_session()
 
     def closeEvent(self, e: Optional[QCloseEvent]):
         super(QMainWindow, self).closeEvent(e)
+        self.coalescer.flush()
 
         if not self.config.state_saved:
             answer = QMessageBox.question(
@@ -100,27 +218,64 @@ class TrackerWindow(QMainWindow):
                 e.ignore()
                 return
 
-        # dereferencing the threads
-        self.task_autosave = None
-        self.task_rotation = None
+        # make sure the last save is written before the window goes away
+        if self.task_save is not None:
+            self.task_save.wait()
 
-        for item in self.config.active_inv.items:
-            item.reward_map = {}
+        if self.pending_save is not None:
+            self.pending_save.write()
+
+            if self.database_backend is not None:
+                self.database_backend.write(self.pending_save)
+
+            self.pending_save = None
+
+        self.save_settings()
+
+        self.end_session()
 
         if self.parent_ is not None:
             self.parent_.show()
             self.close()
 
-    def create_window(self, width: int, height: int):
-        # accounts for platform differences for the windows' size
-        offset = 34 if os.name == "nt" else 20
+    def end_session(self):
+        """Stops the threads and the storages, the window may be reused later (see ``TrackerPool``)"""
+
+        # the progress was either saved or discarded on purpose, nothing to recover
+        for journal in self.journals.values():
+            journal.clear()
+
+        self.journals.clear()
+        self.journal = None
+
+        self.stop_rotation()
+
+        self.task_autosave.run_ = False
+        self.task_autosave.wait()
+
+        if self.player is not None:
+            self.player.stop_playback()
+            self.player = None
+
+        self.recorder = None
+        self.database = None
+        self.database_backend = None
+
+    def start_rotation(self):
+        self.task_rotation = Rotation(self.config)
+        self.task_rotation.positionChanged.connect(self.task_rotation_position_changed)
+        self.task_rotation.start()
 
+    def stop_rotation(self):
+        if self.task_rotation is not None:
+            self.task_rotation.requestInterruption()
+            self.task_rotation.wait()
+            self.task_rotation = None
+
+    def create_window(self):
         # initialize the window's basic informations
         self.setWindowTitle("SaucisseTracker")
         self.setWindowIcon(QIcon(str(Path("res/icon.png").resolve())))
-        self.resize(width, height + offset)
-        self.setMinimumSize(QSize(width, height + offset))
-        self.setMaximumSize(QSize(width, height + offset))
         self.setAutoFillBackground(False)
 
         # create the central widget
@@ -128,26 +283,34 @@ class TrackerWindow(QMainWindow):
         self.centralwidget.setObjectName("centralwidget")
         self.setCentralWidget(self.centralwidget)
 
-    def create_background(self, width: int, height: int):
+    def set_window_size(self, width: int, height: int):
+        # accounts for platform differences for the windows' size
+        offset = 34 if os.name == "nt" else 20
+
+        self.setMinimumSize(QSize(width, height + offset))
+        self.setMaximumSize(QSize(width, height + offset))
+        self.resize(width, height + offset)
+
+    def create_background(self, parent: QWidget, width: int, height: int):
         color = self.config.active_inv.background_color
-        self.bg = QFrame(self.centralwidget)
-        self.bg.setObjectName("bg")
-        self.bg.setGeometry(QRect(0, 0, width, height))
-        self.bg.setMinimumSize(QSize(width, height))
-        self.bg.setMaximumSize(QSize(width, height))
-        self.bg.setLayoutDirection(Qt.LayoutDirection.LeftToRight)
-        self.bg.setAutoFillBackground(False)
-        self.bg.setStyleSheet(f"background-color: rgb({color.r}, {color.g}, {color.b});")
-        self.bg.setFrameShape(QFrame.Shape.StyledPanel)
-        self.bg.setFrameShadow(QFrame.Shadow.Raised)
-        self.bg.setLineWidth(1)
+        bg = QFrame(parent)
+        bg.setObjectName("bg")
+        bg.setGeometry(QRect(0, 0, width, height))
+        bg.setMinimumSize(QSize(width, height))
+        bg.setMaximumSize(QSize(width, height))
+        bg.setLayoutDirection(Qt.LayoutDirection.LeftToRight)
+        bg.setAutoFillBackground(False)
+        bg.setStyleSheet(f"background-color: rgb({color.r}, {color.g}, {color.b});")
+        bg.setFrameShape(QFrame.Shape.StyledPanel)
+        bg.setFrameShadow(QFrame.Shadow.Raised)
+        bg.setLineWidth(1)
 
         # for some reasons using stylesheet for bg doesn't work on windows but this does :)
-        bg_label = QLabel(self.bg)
+        bg_label = QLabel(bg)
         bg_label.setObjectName(f"bg_label")
         bg_label.setGeometry(QRect(0, 0, width, height))
         bg_label.setText("")
-        bg_label.setPixmap(QPixmap(str(self.bg_path)))
+        bg_label.setPixmap(self.config.get_pixmap(self.config.active_inv.background))
 
     def create_menubar(self):
         self.menu = QMenuBar(parent=self)
@@ -157,7 +320,11 @@ class TrackerWindow(QMainWindow):
         self.menu_file.setObjectName("menu_file")
         self.menu_file.setTitle("File")
 
-        self.action_about = QAction(parent=self.menu)
+        self.menu_help = QMenu(parent=self.menu)
+        self.menu_help.setObjectName("menu_help")
+        self.menu_help.setTitle("Help")
+
+        self.action_about = QAction(self.menu_help)
         self.action_about.setObjectName("action_about")
         self.action_about.setText("About")
         self.action_about.triggered.connect(self.about_triggered)
@@ -188,22 +355,280 @@ class TrackerWindow(QMainWindow):
         self.action_autosave.setText("Autosave (5 min)")
         self.action_autosave.triggered.connect(self.file_autosave_triggered)
 
+        self.action_restore_autosave = QAction(self.menu_file)
+        self.action_restore_autosave.setObjectName("action_restore_autosave")
+        self.action_restore_autosave.setText("Restore Autosave")
+        self.action_restore_autosave.triggered.connect(self.file_restore_autosave_triggered)
+
+        self.action_database = QAction(self.menu_file)
+        self.action_database.setCheckable(True)
+        self.action_database.setObjectName("action_database")
+        self.action_database.setText("Session Database")
+        self.action_database.triggered.connect(self.file_database_triggered)
+
+        self.action_restore_session = QAction(self.menu_file)
+        self.action_restore_session.setObjectName("action_restore_session")
+        self.action_restore_session.setText("Restore Session")
+        self.action_restore_session.setEnabled(False)
+        self.action_restore_session.triggered.connect(self.file_restore_session_triggered)
+
+        self.action_journal = QAction(self.menu_file)
+        self.action_journal.setCheckable(True)
+        self.action_journal.setObjectName("action_journal")
+        self.action_journal.setText("Journal (crash recovery)")
+        self.action_journal.triggered.connect(self.file_journal_triggered)
+
+        self.action_record = QAction(self.menu_file)
+        self.action_record.setCheckable(True)
+        self.action_record.setObjectName("action_record")
+        self.action_record.setText("Record Session")
+        self.action_record.triggered.connect(self.file_record_triggered)
+
+        self.action_replay = QAction(self.menu_file)
+        self.action_replay.setObjectName("action_replay")
+        self.action_replay.setText("Replay Session")
+        self.action_replay.triggered.connect(self.file_replay_triggered)
+
+        self.action_refresh = QAction(self.menu_file)
+        self.action_refresh.setObjectName("action_refresh")
+        self.action_refresh.setText("Refresh")
+        self.action_refresh.setShortcuts(QKeySequence.StandardKey.Refresh)
+        self.action_refresh.triggered.connect(self.file_refresh_triggered)
+
+        self.action_resume = QAction(self.menu_file)
+        self.action_resume.setCheckable(True)
+        self.action_resume.setObjectName("action_resume")
+        self.action_resume.setText("Resume on Launch")
+        self.action_resume.triggered.connect(self.file_resume_triggered)
+        self.action_resume.setEnabled(self.parent_ is not None)
+
         self.menu_file.addAction(self.action_open)
         self.menu_file.addAction(self.action_save)
         self.menu_file.addAction(self.action_autosave)
+        self.menu_file.addAction(self.action_restore_autosave)
+        self.menu_file.addAction(self.action_journal)
+        self.menu_file.addAction(self.action_database)
+        self.menu_file.addAction(self.action_restore_session)
+        self.menu_file.addAction(self.action_record)
+        self.menu_file.addAction(self.action_replay)
+        self.menu_file.addAction(self.action_refresh)
+        self.menu_file.addAction(self.action_resume)
         self.menu_file.addAction(self.action_close)
         self.menu_file.addAction(self.action_exit)
+        self.menu_edit = QMenu(parent=self.menu)
+        self.menu_edit.setObjectName("menu_edit")
+        self.menu_edit.setTitle("Edit")
+        self.menu_edit.aboutToShow.connect(self.menu_edit_about_to_show)
+
+        self.action_undo = QAction(self.menu_edit)
+        self.action_undo.setObjectName("action_undo")
+        self.action_undo.setText("Undo")
+        self.action_undo.setShortcuts(QKeySequence.StandardKey.Undo)
+        self.action_undo.triggered.connect(self.edit_undo_triggered)
+
+        self.action_redo = QAction(self.menu_edit)
+        self.action_redo.setObjectName("action_redo")
+        self.action_redo.setText("Redo")
+        self.action_redo.setShortcuts(QKeySequence.StandardKey.Redo)
+        self.action_redo.triggered.connect(self.edit_redo_triggered)
+
+        self.action_history_usage = QAction(self.menu_edit)
+        self.action_history_usage.setObjectName("action_history_usage")
+        self.action_history_usage.setEnabled(False)
+
+        self.menu_edit.addAction(self.action_undo)
+        self.menu_edit.addAction(self.action_redo)
+        self.menu_edit.addSeparator()
+        self.menu_edit.addAction(self.action_history_usage)
+
+        self.menu_inventory = QMenu(parent=self.menu)
+        self.menu_inventory.setObjectName("menu_inventory")
+        self.menu_inventory.setTitle("Inventory")
+
+        self.inventory_actions = QActionGroup(self.menu_inventory)
+        self.inventory_actions.triggered.connect(self.inventory_triggered)
+
+        for i, inventory in enumerate(sorted(self.config.inventories.values(), key=lambda inv: inv.index)):
+            action = QAction(self.menu_inventory)
+            action.setCheckable(True)
+            action.setObjectName(f"action_inventory_{inventory.index}")
+            action.setText(inventory.name)
+            action.setData(inventory.index)
+
+            if i < 9:
+                action.setShortcut(QKeySequence(f"Ctrl+{i + 1}"))
+
+            self.inventory_actions.addAction(action)
+            self.menu_inventory.addAction(action)
+
+        self.menu_debug = QMenu(parent=self.menu)
+        self.menu_debug.setObjectName("menu_debug")
+        self.menu_debug.setTitle("Debug")
+
+        self.action_profiling = QAction(self.menu_debug)
+        self.action_profiling.setCheckable(True)
+        self.action_profiling.setChecked(PROFILER.enabled)
+        self.action_profiling.setObjectName("action_profiling")
+        self.action_profiling.setText("Profiling")
+        self.action_profiling.triggered.connect(self.debug_profiling_triggered)
+
+        self.action_profiler_summary = QAction(self.menu_debug)
+        self.action_profiler_summary.setObjectName("action_profiler_summary")
+        self.action_profiler_summary.setText("Profiler Summary")
+        self.action_profiler_summary.triggered.connect(self.debug_profiler_summary_triggered)
+
+        self.action_export_trace = QAction(self.menu_debug)
+        self.action_export_trace.setObjectName("action_export_trace")
+        self.action_export_trace.setText("Export Trace")
+        self.action_export_trace.triggered.connect(self.debug_export_trace_triggered)
+
+        self.menu_debug.addAction(self.action_profiling)
+        self.menu_debug.addAction(self.action_profiler_summary)
+        self.action_memory_report = QAction(self.menu_debug)
+        self.action_memory_report.setObjectName("action_memory_report")
+        self.action_memory_report.setText("Memory Report")
+        self.action_memory_report.triggered.connect(self.debug_memory_report_triggered)
+        self.action_input_report = QAction(self.menu_debug)
+        self.action_input_report.setObjectName("action_input_report")
+        self.action_input_report.setText("Input Report")
+        self.action_input_report.triggered.connect(self.debug_input_report_triggered)
+
+        self.menu_debug.addAction(self.action_export_trace)
+        self.menu_debug.addSeparator()
+        self.menu_debug.addAction(self.action_memory_report)
+        self.menu_debug.addAction(self.action_input_report)
+
         self.menu.addAction(self.menu_file.menuAction())
-        self.menu.addAction(self.action_about)
+        self.menu.addAction(self.menu_edit.menuAction())
+
+        if len(self.config.inventories) > 1:
+            self.menu.addAction(self.menu_inventory.menuAction())
+
+        self.menu.addAction(self.menu_debug.menuAction())
+        self.action_stall_report = QAction(self.menu_help)
+        self.action_stall_report.setObjectName("action_stall_report")
+        self.action_stall_report.setText("Stall Report")
+        self.action_stall_report.triggered.connect(self.help_stall_report_triggered)
+
+        self.menu_help.addAction(self.action_about)
+        self.menu_help.addAction(self.action_stall_report)
+
+        self.menu.addAction(self.menu_help.menuAction())
         self.setMenuBar(self.menu)
 
-    def create_labels(self):
-        offset = -1 if os.name == "nt" else 0
+    @profiled
+    def create_view(self):
+        """Creates the background and the labels of the active inventory in their own widget"""
+
+        inventory = self.config.active_inv
+        width, height = self.config.get_image_size(inventory.background)
+
+        widget = QWidget(self.centralwidget)
+        widget.setObjectName(f"inventory_{inventory.index}")
+        widget.setGeometry(QRect(0, 0, width, height))
+
+        # the widgets are created in one batch, the view is painted once it's shown
+        widget.setUpdatesEnabled(False)
+        self.create_background(widget, width, height)
+        self.create_labels(widget)
+        widget.setUpdatesEnabled(True)
+
+        initial_state = State(self.config)
+        initial_state.get_states_from_labels()
+        view = InventoryView(inventory, widget, History(self.config), initial_state)
+
+        # the go mode isn't part of the inventory, it keeps its current state
+        saved_state = self.saved_states.pop(inventory.index, None)
+        if saved_state is not None:
+            saved_state.get_gomode_state()
+            saved_state.apply()
+
+        return view
+
+    def show_view(self, view: InventoryView):
+        self.set_window_size(view.widget.width(), view.widget.height())
+        view.widget.show()
+        self.history = view.history
+
+        # draw the go mode stuff in front of the items
+        # - side effect: can't click on the items behind them when they're visible
+        # - will I fix this? maybe one day, idk :peepoShrug:
+        if self.config.label_gomode_light is not None:
+            self.config.label_gomode_light.raise_()
+
+        if self.config.label_gomode is not None:
+            self.config.label_gomode.raise_()
+
+        for action in self.inventory_actions.actions():
+            action.setChecked(action.data() == view.inventory.index)
+
+    def remove_views(self):
+        """Deletes the least recently shown views above ``max_views``, their state is kept"""
+
+        shown = self.config.active_inv
+
+        while len(self.views) > self.max_views:
+            index, view = self.views.popitem(last=False)
+
+            self.config.active_inv = view.inventory
+            self.saved_states[index] = State(self.config)
+            self.saved_states[index].get_states_from_labels()
+
+            view.inventory.label_map = {}
+            for item in view.inventory.items:
+                item.reward_map = {}
+
+            view.widget.deleteLater()
+
+        self.config.active_inv = shown
+
+    def switch_inventory(self, index: int):
+        """Shows another inventory, its view is created the first time it's shown then kept"""
+
+        # the waiting input belongs to the inventory shown until now
+        self.coalescer.flush()
 
+        if index == self.config.active_inv.index:
+            return
+
+        if self.recorder is not None or self.player is not None:
+            show_error(self, "ERROR: the inventory can't be changed while a session is recorded or replayed")
+            self.show_view(self.views[self.config.active_inv.index])
+            return
+
+        # the journal is up to date when the inventory is shown again
+        if self.journal is not None:
+            self.journal.compact()
+            self.journal.stop()
+            self.journal = None
+
+        self.views[self.config.active_inv.index].widget.hide()
+        self.config.active_inv = self.config.inventories[index]
+        view = self.views.pop(index, None)
+
+        if view is None:
+            view = self.create_view()
+
+        self.views[index] = view
+        self.show_view(view)
+        self.remove_views()
+
+        if self.config.journal_enabled:
+            if index in self.journals:
+                self.journal = self.journals[index]
+                self.journal.start()
+            else:
+                self.start_journal()
+
+        # the database's sessions are per inventory
+        if self.config.database_enabled:
+            self.file_database_triggered()
+
+    def create_gomode(self):
         # create go mode label and light stuff
         if self.config.gomode_settings is not None:
             gomode_settings = self.config.gomode_settings
-            width, height = Image.open(gomode_settings.path).size
+            width, height = self.config.get_image_size(gomode_settings.path)
 
             self.config.label_gomode = Label.new(
                 self.config,
@@ -219,13 +644,13 @@ class TrackerWindow(QMainWindow):
             )
 
             if gomode_settings.light_path is not None and gomode_settings.light_pos is not None:
-                width, height = Image.open(gomode_settings.light_path).size
+                width, height = self.config.get_image_size(gomode_settings.light_path)
 
                 self.config.label_gomode_light = RotationWidget.new(
                     self.centralwidget,
                     "label_gomode_light",
                     QRect(gomode_settings.light_pos.x, gomode_settings.light_pos.y, width, height),
-                    str(gomode_settings.light_path),
+                    self.config.get_pixmap(gomode_settings.light_path),
                 )
 
                 self.config.label_gomode_light.setVisible(False)
@@ -233,23 +658,28 @@ class TrackerWindow(QMainWindow):
             self.config.label_gomode.clicked_left.connect(self.label_gomode_clicked_left)
             self.config.label_gomode.clicked_right.connect(self.label_gomode_clicked_right)
 
+    @profiled
+    def create_labels(self, parent: QWidget):
+        offset = -1 if os.name == "nt" else 0
+
         # create labels for every items of the active inventory
         for item in self.config.active_inv.items:
             label_map: dict[int, Label] = {}
 
             for i, item_pos in enumerate(item.positions):
                 obj_name = f"item{item.index}_pos_{i}"
+                label_id = LabelId(self.config.active_inv.index, item.index, i)
                 pos = Pos(item_pos.x + offset, item_pos.y + offset)
 
                 if item.scale_content:
                     width = 32
                     height = 32
                 else:
-                    width, height = Image.open(item.paths[0]).size
+                    width, height = self.config.get_image_size(item.paths[0])
 
                 label = Label.new(
                     self.config,
-                    self.centralwidget,
+                    parent,
                     item.index,
                     item.name,
                     obj_name,
@@ -258,33 +688,10 @@ class TrackerWindow(QMainWindow):
                     1.0 if item.enabled else GLOBAL_HALF_OPACITY,
                     item.scale_content,
                     0.0 if item.enabled else 1.0,
+                    label_id,
+                    self.dispatcher,
                 )
 
-                label.clicked_left.connect(self.label_clicked_left)
-                label.clicked_middle.connect(self.label_clicked_middle)
-                label.clicked_right.connect(self.label_clicked_right)
-
-                if item.counter is not None:
-                    label.label_counter = OutlinedLabel.new(
-                        self.centralwidget,
-                        self.config,
-                        f"{obj_name}_counter",
-                        QRect(
-                            pos.x + item.counter.pos.x,
-                            pos.y + item.counter.pos.y,
-                            item.counter.width,
-                            item.counter.height,
-                        ),
-                        "",
-                        item.counter.text_settings_index,
-                    )
-
-                    # emit a click if the counter label is clicked (workaround for priority)
-                    label.label_counter.item_label = label
-                    label.label_counter.clicked_left.connect(self.outlinedLabel_clicked_left)
-                    label.label_counter.clicked_middle.connect(self.outlinedLabel_clicked_middle)
-                    label.label_counter.clicked_right.connect(self.outlinedLabel_clicked_right)
-
                 if item.is_reward:
                     reward_info = self.config.active_inv.rewards.items[label.reward_index]
                     geometry = QRect(
@@ -296,7 +703,7 @@ class TrackerWindow(QMainWindow):
                         item.reward_map[i].setText(reward_info.name)
                     else:
                         item.reward_map[i] = OutlinedLabel.new(
-                            self.centralwidget,
+                            parent,
                             self.config,
                             f"{obj_name}_reward",
                             geometry,
@@ -304,91 +711,364 @@ class TrackerWindow(QMainWindow):
                             reward_info.text_settings_index,
                         )
 
-                    if item.reward_map[i].item_label is None:
-                        item.reward_map[i].item_label = label
+                    item.reward_map[i].label_id = label_id
+                    item.reward_map[i].item_label = label
                     label.raise_()
 
-                if item.extra_index is not None:
-                    extra = self.config.extras.items[item.extra_index]
-                    width, height = Image.open(extra.path).size
-                    label.label_extra_img = Label.new(
-                        self.config,
-                        self.centralwidget,
-                        item.index,
-                        item.name,
-                        f"{obj_name}_extra_img",
-                        QRect(pos.x + extra.pos.x, pos.y + extra.pos.y, width, height),
-                        str(extra.path),
-                        1.0,
-                        False,
-                        0.0,
-                    )
-
-                    label.label_extra_img.setVisible(False)
-                    label.label_extra_img.clicked_left.connect(self.label_clicked_left)
-                    label.label_extra_img.clicked_middle.connect(self.label_clicked_middle)
-                    label.label_extra_img.clicked_right.connect(self.label_clicked_right)
-
-                if len(self.config.flags) > 0 and item.flag_index is not None:
-                    flag = self.config.flags[item.flag_index]
-                    label.label_flag = OutlinedLabel.new(
-                        self.centralwidget,
-                        self.config,
-                        f"{obj_name}_flag",
-                        QRect(pos.x + flag.pos.x, pos.y + flag.pos.y, flag.width, flag.height),
-                        flag.texts[label.flag_text_index],
-                        flag.text_settings_index,
-                    )
-                    label.label_flag.setHidden(flag.hidden)
-
-                    label.label_flag.item_label = label
-                    label.label_flag.clicked_left.connect(self.outlinedLabel_clicked_left)
-                    label.label_flag.clicked_middle.connect(self.outlinedLabel_clicked_middle)
-                    label.label_flag.clicked_right.connect(self.outlinedLabel_clicked_right)
+                # the counters, the extra images and the hidden flags are created the first time they're shown
+                if label.has_flag() and not self.config.flags[item.flag_index].hidden:
+                    label.get_flag().setVisible(True)
 
                 label_map[i] = label
 
             self.config.active_inv.label_map[item.index] = label_map
 
-        # draw the go mode stuff in front of the items
-        # - side effect: can't click on the items behind them when they're visible
-        # - will I fix this? maybe one day, idk :peepoShrug:
-        if self.config.label_gomode_light is not None:
-            self.config.label_gomode_light.raise_()
+    def apply_state(self, state: State, saved: bool = False):
+        """Applies a whole state (a state file, an autosave, a database's session, a recording, ...)"""
 
-        if self.config.label_gomode is not None:
-            self.config.label_gomode.raise_()
+        state.apply()
+        self.config.state_saved = saved
+
+        # the journal's records follow its snapshot, the next recovery would replay them over the previous progress
+        if self.journal is not None:
+            self.journal.compact()
+
+    def open_state(self):
+        """Reads and applies the config's state file, the tracker is left as it is if the state can't be used"""
+
+        state = State(self.config)
+
+        if not state.read():
+            return False
+
+        self.apply_state(state, True)
+        return True
+
+    def start_journal(self):
+        self.journal = self.journals[self.config.active_inv.index] = StateJournal(self.config)
+
+        if self.journal.restore():
+            print("INFO: the tracker's progress was restored from the journal")
+
+        self.journal.start()
+
+    def get_item_label(self, label: Label | OutlinedLabel):
+        """Returns the item's label of any label of the item (item, counter, flag, extra image)"""
+
+        return self.config.active_inv.get_label(label.label_id)
+
+    def get_update_kind(self, label: Label, middle_click: bool):
+        # matches the branches of ``Label.update_label``
+        item = self.config.active_inv.items[label.index]
+
+        if not middle_click and len(item.paths) > 1:
+            return ActionKind.PROGRESSIVE
+        elif label.has_counter():
+            return ActionKind.COUNTER
+
+        return ActionKind.TOGGLE
+
+    def start_save(self, state: State):
+        self.task_save = StateWriterThread(state, [self.database_backend] if self.database_backend else None)
+        self.task_save.written.connect(self.task_save_written)
+        self.task_save.start()
+
+    @profiled
+    def perform_action(self, action: Action):
+        self.config.state_saved = False
+        label = None
+
+        if action.kind != ActionKind.GOMODE:
+            label_id = LabelId(self.config.active_inv.index, action.index, action.pos_index)
+            label = self.config.active_inv.get_label(label_id)
+
+        before = self.history.capture(action, label)
+
+        match action.kind:
+            case ActionKind.TOGGLE | ActionKind.PROGRESSIVE | ActionKind.COUNTER:
+                label.update_label(action.increase, action.middle_click, action.steps)
+            case ActionKind.REWARD:
+                item = self.config.active_inv.items[action.index]
+                reward = item.reward_map[action.pos_index]
+
+                if reward is not None and reward.item_label is not None:
+                    label.reward_index += 1
+
+                    if label.reward_index > len(self.config.active_inv.rewards.items) - 1:
+                        label.reward_index = 0
+
+                    item.update_reward(label, self.config.active_inv.rewards.items[label.reward_index])
+            case ActionKind.FLAG:
+                label.get_flag().setVisible(label.label_flag.isHidden())
+            case ActionKind.EXTRA:
+                label.get_extra_img().setVisible(label.label_extra_img.isHidden())
+            case ActionKind.GOMODE:
+                self.config.label_gomode.update_gomode()
+
+        self.history.push(action, before, self.history.capture(action, label))
+
+        if self.recorder is not None:
+            self.recorder.record(action)
+
+        if self.journal is not None:
+            self.journal.append(action, label)
+
+    def save_settings(self):
+        """
+        Remembers this tracker to resume it on the next launch, only if it was opened from the main menu (or resumed),
+        the trackers of the command line and the tools don't replace the user's last tracker
+        """
+
+        if self.parent_ is None:
+            return
+
+        settings = Settings.load()
+        settings.config_path = str(self.config.source_path)
+        settings.fingerprint = self.config.fingerprint
+        settings.inventory = self.config.active_inv.index
+        settings.state_path = str(self.config.state_path) if self.config.state_path is not None else None
+        settings.window_pos = (self.x(), self.y())
+        settings.resume_on_launch = self.action_resume.isChecked()
+        settings.save()
+
+    def apply_history_entry(self, entry: Optional[HistoryEntry], undo: bool):
+        if entry is not None:
+            self.config.state_saved = False
+            label = self.history.apply(entry, undo)
+
+            if self.journal is not None:
+                self.journal.append(entry.action, label)
 
     # connections callbacks
 
     def file_open_triggered(self):
         if self.config.state_path is None:
             self.config.state_path = Path(
-                QFileDialog.getOpenFileName(None, "Open State File", str(Path.home()), "*.txt")[0]
+                QFileDialog.getOpenFileName(None, "Open State File", str(Path.home()), STATE_FILE_FILTER)[0]
             ).resolve()
 
         if self.config.state_path.exists():
-            state = State(self.config)
-            state.open()
+            self.open_state()
 
     def file_save_triggered(self):
+        self.coalescer.flush()
+
         if self.config.state_path is None:
-            self.config.state_path = Path(
-                QFileDialog.getSaveFileName(None, "Save State File", str(Path.home()), "*.txt")[0]
-            ).resolve()
+            path = QFileDialog.getSaveFileName(None, "Save State File", str(Path.home()), STATE_FILE_FILTER)[0]
 
-        if self.config.state_path.exists():
-            state = State(self.config)
-            state.save()
+            if len(path) == 0:
+                return
+
+            self.config.state_path = Path(path).resolve()
+
+        state = State(self.config)
+        state.get_states_from_labels()
+        self.config.state_saved = True
+
+        if self.task_save is not None:
+            self.pending_save = state
+        else:
+            self.start_save(state)
 
     def file_autosave_triggered(self):
         self.config.autosave_enabled = self.action_autosave.isChecked()
         self.task_autosave.run_ = self.config.autosave_enabled
 
+        if self.config.autosave_enabled and not self.task_autosave.isRunning():
+            self.task_autosave.start()
+
+    def file_restore_autosave_triggered(self):
+        store = AutosaveStore(self.config)
+        entry = ListDialog.get_data(
+            self,
+            "Restore Autosave",
+            [(entry.time.strftime("%d/%m/%Y %H:%M:%S"), entry) for entry in store.get_entries()],
+        )
+
+        if entry is not None:
+            state = State(self.config)
+
+            if store.load(entry, state):
+                self.apply_state(state)
+
+    def file_database_triggered(self):
+        self.config.database_enabled = self.action_database.isChecked()
+
+        if self.config.database_enabled:
+            self.database = SessionDatabase()
+            session = self.database.start_session(self.config)
+            self.database_backend = DatabaseBackend(self.database, session)
+            self.task_autosave.database_backend = DatabaseBackend(self.database, session, autosave=True)
+        else:
+            self.database = None
+            self.database_backend = None
+            self.task_autosave.database_backend = None
+
+        self.action_restore_session.setEnabled(self.config.database_enabled)
+
+    def file_restore_session_triggered(self):
+        time_format = "%d/%m/%Y %H:%M:%S"
+        session = ListDialog.get_data(
+            self,
+            "Restore Session",
+            [
+                (f"Session #{session.id} ({datetime.fromtimestamp(session.started).strftime(time_format)})", session)
+                for session in self.database.get_sessions(self.config)
+            ],
+        )
+
+        if session is not None:
+            point = ListDialog.get_data(
+                self,
+                f"Restore Session #{session.id}",
+                [
+                    (
+                        datetime.fromtimestamp(entry.time).strftime(time_format)
+                        + (" (autosave)" if entry.autosave else ""),
+                        entry.time,
+                    )
+                    for entry in self.database.get_states(session.id)
+                ],
+            )
+
+            if point is not None:
+                state = State(self.config, backend=DatabaseBackend(self.database, session.id, point))
+
+                if state.read():
+                    self.apply_state(state)
+
+    def file_journal_triggered(self):
+        self.config.journal_enabled = self.action_journal.isChecked()
+
+        if self.config.journal_enabled:
+            # the journal left by a crash is restored before it's replaced by the current progress
+            self.start_journal()
+        else:
+            for journal in self.journals.values():
+                journal.clear()
+
+            self.journals.clear()
+            self.journal = None
+
+    def menu_edit_about_to_show(self):
+        self.action_history_usage.setText(
+            f"History: {len(self.history.undo_stack)} actions ({self.history.get_memory_usage() / 1024:.1f} KiB)"
+        )
+
+    def edit_undo_triggered(self):
+        self.coalescer.flush()
+        self.apply_history_entry(self.history.undo(), True)
+
+        if self.recorder is not None:
+            self.recorder.record_history(RECORD_UNDO)
+
+    def inventory_triggered(self, action: QAction):
+        self.switch_inventory(action.data())
+
+    def edit_redo_triggered(self):
+        self.coalescer.flush()
+        self.apply_history_entry(self.history.redo(), False)
+
+        if self.recorder is not None:
+            self.recorder.record_history(RECORD_REDO)
+
+    def file_record_triggered(self):
+        self.coalescer.flush()
+
+        if self.action_record.isChecked():
+            # undoing an action done before the recording couldn't be replayed
+            self.history.clear()
+            self.recorder = SessionRecorder(self.config)
+        elif self.recorder is not None:
+            recorder = self.recorder
+            self.recorder = None
+            path = QFileDialog.getSaveFileName(None, "Save Recording", str(Path.home()), RECORDING_FILE_FILTER)[0]
+
+            if len(path) > 0:
+                recorder.save(Path(path).resolve())
+
+    def file_replay_triggered(self):
+        if self.player is not None:
+            self.player.stop_playback()
+            self.player = None
+
+        path = QFileDialog.getOpenFileName(None, "Open Recording", str(Path.home()), RECORDING_FILE_FILTER)[0]
+
+        if len(path) == 0:
+            return
+
+        recording = Recording(Path(path).resolve())
+
+        if not recording.is_compatible(self.config):
+            show_error(self, "ERROR: this recording was made with a different configuration")
+            return
+
+        speed = ListDialog.get_data(
+            self,
+            "Replay Speed",
+            [("1x", 1.0), ("2x", 2.0), ("4x", 4.0), ("8x", 8.0), ("As fast as possible", 0.0)],
+        )
+
+        if speed is not None:
+            self.player = SessionPlayer(self, recording, speed)
+            self.player.finished.connect(self.player_finished)
+            self.player.start_playback()
+            self.config.state_saved = False
+
+    def debug_profiling_triggered(self):
+        PROFILER.set_enabled(self.action_profiling.isChecked())
+
+    def debug_profiler_summary_triggered(self):
+        if self.profiler_window is None:
+            self.profiler_window = ProfilerWindow(self)
+
+        self.profiler_window.show()
+        self.profiler_window.raise_()
+
+    def debug_export_trace_triggered(self):
+        export_trace(self)
+
+    def debug_memory_report_triggered(self):
+        TextDialog(self, "Memory Report", get_memory_report(self.config, self)).exec()
+
+    def debug_input_report_triggered(self):
+        TextDialog(self, "Input Report", self.coalescer.get_report()).exec()
+
+    @profiled
+    def file_refresh_triggered(self):
+        self.coalescer.flush()
+
+        if self.recorder is not None or self.player is not None:
+            show_error(self, "ERROR: the config can't be refreshed while a session is recorded or replayed")
+            return
+
+        fingerprint = self.config.fingerprint
+
+        if not ConfigReload(self).apply():
+            return
+
+        # the saved states, the journal and the database's session are tied to the previous layout
+        if self.config.fingerprint != fingerprint:
+            self.config.state_saved = False
+
+            if self.journal is not None:
+                self.journal.compact()
+
+            if self.config.database_enabled:
+                self.file_database_triggered()
+
+        # the updated tracker can be reused for the file as it is now
+        if self.pool_key is not None:
+            self.pool_key = TrackerPool.get_key(self.config)
+
+    def file_resume_triggered(self):
+        self.save_settings()
+
     def file_close_triggered(self):
         self.close()
 
     def file_exit_triggered(self):
+        self.save_settings()
         sys.exit()
 
     def about_triggered(self):
@@ -399,67 +1079,114 @@ class TrackerWindow(QMainWindow):
             "Made with ♥ by Yanis.\n" + "Version 0.1.0.\n\n" + "Licensed under GNU General Public License v3.0.",
         )
 
-    def outlinedLabel_clicked_left(self):
-        label: OutlinedLabel = self.sender()
+    def help_stall_report_triggered(self):
+        TextDialog(self, "Stall Report", get_watchdog().get_report()).exec()
 
-        if label.item_label is not None:
-            label.item_label.clicked_left.emit()
+    @profiled
+    def label_clicked_left(self, label: Label | OutlinedLabel):
+        label = self.get_item_label(label)
+        self.coalescer.add(Action(self.get_update_kind(label, False), label.label_id.item, label.label_id.pos, True))
 
-    def outlinedLabel_clicked_middle(self):
-        label: OutlinedLabel = self.sender()
+    @profiled
+    def label_clicked_middle(self, label: Label | OutlinedLabel):
+        label = self.get_item_label(label)
+        label_id = label.label_id
 
-        if label.item_label is not None:
-            label.item_label.clicked_middle.emit()
+        if label.has_flag():
+            self.coalescer.add(Action(ActionKind.FLAG, label_id.item, label_id.pos))
+        else:
+            self.coalescer.add(Action(self.get_update_kind(label, True), label_id.item, label_id.pos, True, True))
 
-    def outlinedLabel_clicked_right(self):
-        label: OutlinedLabel = self.sender()
+    @profiled
+    def label_clicked_right(self, label: Label | OutlinedLabel):
+        label = self.get_item_label(label)
+        label_id = label.label_id
+        item = self.config.active_inv.items[label_id.item]
 
-        if label.item_label is not None:
-            label.item_label.clicked_right.emit()
+        if item.is_reward:
+            self.coalescer.add(Action(ActionKind.REWARD, label_id.item, label_id.pos))
+        elif label.has_extra_img():
+            self.coalescer.add(Action(ActionKind.EXTRA, label_id.item, label_id.pos))
+        else:
+            self.coalescer.add(Action(self.get_update_kind(label, False), label_id.item, label_id.pos, False))
+
+    @profiled
+    def label_scrolled(self, label: Label | OutlinedLabel, steps: int):
+        label = self.get_item_label(label)
+        label_id = label.label_id
+        self.coalescer.add(
+            Action(self.get_update_kind(label, False), label_id.item, label_id.pos, steps > 0, False, abs(steps))
+        )
 
-    def label_clicked_left(self):
-        label: Label = self.sender()
-        label.update_label(True)
-        self.config.state_saved = False
+    @profiled
+    def label_gomode_clicked_left(self):
+        self.perform_action(Action(ActionKind.GOMODE, -1, -1))
 
-    def label_clicked_middle(self):
-        label: Label = self.sender()
-        self.config.state_saved = False
+    @profiled
+    def label_gomode_clicked_right(self):
+        self.perform_action(Action(ActionKind.GOMODE, -1, -1))
 
-        if label.label_flag is not None:
-            label.label_flag.setVisible(not label.label_flag.isVisible())
-        else:
-            label.update_label(True, True)
+    def player_finished(self):
+        print(f"INFO: replayed {len(self.player.recording.actions)} actions")
+        self.player = None
 
-    def label_clicked_right(self):
-        label: Label = self.sender()
-        self.config.state_saved = False
-        item = self.config.active_inv.items[label.index]
+    def task_save_written(self, success: bool, message: str):
+        self.task_save = None
 
-        if item.is_reward:
-            for i, _ in enumerate(item.positions):
-                if label.objectName().endswith(f"_pos_{i}"):
-                    reward = item.reward_map[i]
+        if not success:
+            self.config.state_saved = False
+            show_error(self, f"ERROR: the state couldn't be saved ({message})")
+
+        if self.pending_save is not None:
+            self.start_save(self.pending_save)
+            self.pending_save = None
+
+    def task_rotation_position_changed(self, pos):
+        self.config.label_gomode_light.setPosition(pos)
+
+
+class TrackerPool:
+    """
+    Keeps the closed trackers hidden to reopen them without creating their widgets and decoding their images again.
+    The least recently closed trackers are deleted once the estimated memory of the pool exceeds ``budget`` bytes.
+    """
+
+    def __init__(self, budget: int = 256 * 1024 * 1024):
+        self.budget = budget
+        # key: (window, estimated bytes), from the least recently closed to the most recent
+        self.windows: OrderedDict[tuple, tuple[TrackerWindow, int]] = OrderedDict()
 
-                    if reward is not None and reward.item_label is not None:
-                        label.reward_index += 1
+    @staticmethod
+    def get_key(config: Config):
+        # a tracker is only reused if the config's file didn't change since it was created
+        return (config.source_path, config.source_path.stat().st_mtime_ns, config.active_inv.index)
 
-                        if label.reward_index > len(self.config.active_inv.rewards.items) - 1:
-                            label.reward_index = 0
+    @staticmethod
+    def get_size(window: TrackerWindow):
+        usage = MemoryAccounting(window.config, window).get_usage()
+        return sum(size for _, size in usage.get_totals().values()) + usage.effect_buffers
 
-                        item.update_reward(i, self.config.active_inv.rewards.items[label.reward_index])
-        elif label.label_extra_img is not None:
-            label.label_extra_img.setVisible(not label.label_extra_img.isVisible())
+    def open(self, parent: Optional[QWidget], config: Config):
+        """Returns a tracker for a new session of the config, a closed one is reused if possible"""
+
+        key = self.get_key(config)
+        entry = self.windows.pop(key, None)
+
+        if entry is not None:
+            window = entry[0]
+            window.reuse(config)
         else:
-            label.update_label(False)
+            window = TrackerWindow(parent, config.new_session())
+            window.pool_key = key
 
-    def label_gomode_clicked_left(self):
-        label: Label = self.sender()
-        label.update_gomode()
+        return window
 
-    def label_gomode_clicked_right(self):
-        label: Label = self.sender()
-        label.update_gomode()
+    def add(self, window: TrackerWindow):
+        """Keeps a closed tracker"""
 
-    def task_rotation_position_changed(self, pos):
-        self.config.label_gomode_light.setPosition(pos)
+        if window.pool_key is not None:
+            self.windows[window.pool_key] = (window, self.get_size(window))
+
+            while sum(size for _, size in self.windows.values()) > self.budget:
+                _, (evicted, _) = self.windows.popitem(last=False)
+                evicted.deleteLater()
@@ -0,0 +1,264 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+
+from contextlib import redirect_stdout
+from pathlib import Path
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT_DIR / "src"))
+
+from PyQt6.QtCore import Qt, QEvent, QEventLoop, QPoint, QPointF, QT_VERSION_STR
+from PyQt6.QtGui import QMouseEvent, QWheelEvent
+from PyQt6.QtWidgets import QApplication, QWidget
+
+from config import Config
+from state import State
+from tracker import TrackerWindow
+from generate_config import generate_config
+
+# measures the cost of the tracker's interactions on Qt's offscreen platform and prints the results as JSON
+# the latency of an event includes the resulting paint (the pending events are processed before stopping the timer)
+# usage: python tools/benchmark.py config/oot/config.xml --generate 100 1000 --events 200 --output results.json
+
+
+def get_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=ROOT_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def get_stats(latencies: list[float]):
+    if len(latencies) == 0:
+        return None
+
+    latencies = sorted(latency * 1000 for latency in latencies)
+    return {
+        "count": len(latencies),
+        "mean_ms": round(statistics.fmean(latencies), 4),
+        "median_ms": round(statistics.median(latencies), 4),
+        "p95_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 4),
+        "max_ms": round(latencies[-1], 4),
+    }
+
+
+def send_click(widget: QWidget, button: Qt.MouseButton):
+    pos = QPointF(widget.width() / 2, widget.height() / 2)
+    global_pos = QPointF(widget.mapToGlobal(pos.toPoint()))
+
+    for event_type in [QEvent.Type.MouseButtonPress, QEvent.Type.MouseButtonRelease]:
+        event = QMouseEvent(event_type, pos, global_pos, button, button, Qt.KeyboardModifier.NoModifier)
+        QApplication.sendEvent(widget, event)
+
+
+def send_wheel(widget: QWidget, increase: bool):
+    pos = QPointF(widget.width() / 2, widget.height() / 2)
+    event = QWheelEvent(
+        pos,
+        QPointF(widget.mapToGlobal(pos.toPoint())),
+        QPoint(),
+        QPoint(0, 120 if increase else -120),
+        Qt.MouseButton.NoButton,
+        Qt.KeyboardModifier.NoModifier,
+        Qt.ScrollPhase.NoScrollPhase,
+        False,
+    )
+    QApplication.sendEvent(widget, event)
+
+
+def wait_idle(window: TrackerWindow):
+    # every event is measured as the first input after an idle frame, it isn't coalesced with the previous one
+    window.coalescer.flush()
+    window.coalescer.timer.stop()
+
+
+def measure(window: TrackerWindow, targets: list[QWidget], num_events: int, send):
+    latencies: list[float] = []
+
+    if len(targets) > 0:
+        for _ in range(num_events):
+            widget = random.choice(targets)
+            wait_idle(window)
+            start = time.perf_counter()
+            send(widget)
+            QApplication.processEvents()
+            latencies.append(time.perf_counter() - start)
+
+    return get_stats(latencies)
+
+
+def measure_bursts(window: TrackerWindow, targets: list[QWidget], num_bursts: int, burst: int):
+    """
+    Sends ``burst`` wheel events to a label at once (a fast wheel or a touchpad), the latency of a burst lasts
+    until every event was performed and painted, returns the number of renders (performed actions) per burst too
+    """
+
+    latencies: list[float] = []
+    renders = 0
+
+    for _ in range(num_bursts if len(targets) > 0 else 0):
+        widget = random.choice(targets)
+        wait_idle(window)
+        performed = window.coalescer.performed
+        start = time.perf_counter()
+
+        for _ in range(burst):
+            send_wheel(widget, random.random() < 0.75)
+
+        while window.coalescer.is_pending():
+            QApplication.processEvents(QEventLoop.ProcessEventsFlag.WaitForMoreEvents)
+
+        QApplication.processEvents()
+        latencies.append(time.perf_counter() - start)
+        renders += window.coalescer.performed - performed
+
+    stats = get_stats(latencies)
+
+    if stats is not None:
+        stats["events"] = burst
+        stats["renders"] = round(renders / len(latencies), 4)
+
+    return stats
+
+
+def run(widget: QWidget, path: Path, num_events: int, repeat: int):
+    result = {"config": str(path)}
+
+    start = time.perf_counter()
+    config = Config(widget, path)
+    result["parse_ms"] = round((time.perf_counter() - start) * 1000, 4)
+
+    start = time.perf_counter()
+    window = TrackerWindow(None, config)
+    window.show()
+    QApplication.processEvents()
+    result["window_ms"] = round((time.perf_counter() - start) * 1000, 4)
+    result["widgets"] = len(window.findChildren(QWidget))
+
+    # the light's rotation repaints every few milliseconds and would be measured with every event
+    window.task_rotation.requestInterruption()
+    window.task_rotation.wait()
+
+    labels = [label for sub_map in config.active_inv.label_map.values() for label in sub_map.values()]
+    # the counters' and the flags' labels are only created once they're shown, their clicks are the item's
+    counters = [label for label in labels if label.has_counter()]
+    flags = [label for label in labels if label.has_flag()]
+    wheel_labels = [label for label in labels if config.active_inv.items[label.index].use_wheel]
+    result["labels"] = len(labels)
+
+    result["events"] = {
+        "left_click": measure(window, labels, num_events, lambda w: send_click(w, Qt.MouseButton.LeftButton)),
+        "middle_click": measure(window, labels, num_events, lambda w: send_click(w, Qt.MouseButton.MiddleButton)),
+        "right_click": measure(window, labels, num_events, lambda w: send_click(w, Qt.MouseButton.RightButton)),
+        "wheel": measure(window, wheel_labels, num_events, lambda w: send_wheel(w, random.choice([True, False]))),
+        "wheel_burst": measure_bursts(window, wheel_labels, max(1, num_events // 10), 10),
+        "counter_click": measure(window, counters, num_events, lambda w: send_click(w, Qt.MouseButton.LeftButton)),
+        "flag_click": measure(window, flags, num_events, lambda w: send_click(w, Qt.MouseButton.MiddleButton)),
+    }
+    result["input"] = {
+        "inputs": window.coalescer.inputs,
+        "performed": window.coalescer.performed,
+        "max_per_second": window.coalescer.max_per_second,
+    }
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        save_times: list[float] = []
+        open_times: list[float] = []
+
+        for _ in range(repeat):
+            state = State(config, Path(temp_dir) / "state.json")
+            start = time.perf_counter()
+            state.save()
+            save_times.append(time.perf_counter() - start)
+
+            state = State(config, Path(temp_dir) / "state.json")
+            start = time.perf_counter()
+            state.open()
+            QApplication.processEvents()
+            open_times.append(time.perf_counter() - start)
+
+        result["state_save"] = get_stats(save_times)
+        result["state_open"] = get_stats(open_times)
+
+    # nothing to save when closing the window
+    config.state_saved = True
+    window.close()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks the tracker's interactions")
+    parser.add_argument("configs", type=Path, nargs="*", help="paths to the configurations to benchmark")
+    parser.add_argument("--generate", type=int, nargs="*", default=[], help="also benchmark generated configs")
+    parser.add_argument("--positions", type=int, default=4, help="number of positions per item (generated configs)")
+    parser.add_argument("--sources", type=int, default=3, help="number of sources per item (generated configs)")
+    parser.add_argument("--events", type=int, default=200, help="number of events per kind of event")
+    parser.add_argument("--repeat", type=int, default=10, help="number of state saves and opens")
+    parser.add_argument("--seed", type=int, default=0, help="seed used to pick the labels")
+    parser.add_argument("--output", type=Path, help="optional, writes the results to this path instead of stdout")
+    args = parser.parse_args()
+
+    configs: list[Path] = args.configs
+    if len(configs) == 0 and len(args.generate) == 0:
+        configs = [ROOT_DIR / "config" / "oot" / "config.xml"]
+
+    app = QApplication(sys.argv)
+    widget = QWidget()
+    random.seed(args.seed)
+
+    results = {
+        "commit": get_commit(),
+        "python": platform.python_version(),
+        "qt": QT_VERSION_STR,
+        "platform": platform.platform(),
+        "events": args.events,
+        "repeat": args.repeat,
+        "configs": [],
+    }
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for num_items in args.generate:
+            # a tenth of the items of each kind
+            path = generate_config(
+                Path(temp_dir) / f"generated_{num_items}",
+                items=num_items,
+                positions=args.positions,
+                sources=args.sources,
+                counters=num_items // 10,
+                flags=num_items // 10,
+                rewards=num_items // 10,
+                extras=num_items // 10,
+            )
+            configs.append(path)
+
+        for path in configs:
+            try:
+                # keeps stdout for the results
+                with redirect_stdout(sys.stderr):
+                    results["configs"].append(run(widget, path.resolve(), args.events, args.repeat))
+            except Exception as e:
+                # for instance the shipped config doesn't include the items' images
+                print(f"ERROR: '{path}' couldn't be benchmarked ({e!r})", file=sys.stderr)
+                results["configs"].append({"config": str(path), "error": repr(e)})
+
+    data = json.dumps(results, indent=4)
+
+    if args.output is not None:
+        args.output.write_text(data + "\n")
+    else:
+        print(data)
+
+    app.quit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+import math
+import random
+import shutil
+import argparse
+import xml.etree.ElementTree as ET
+
+from pathlib import Path
+
+from PIL import Image
+
+# generates a valid configuration of any size with placeholder images, to measure how the tracker scales
+# usage: python tools/generate_config.py config/generated --items 1000 --positions 2 --sources 3 --counters 100
+
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+FONT_PATH = ROOT_DIR / "config" / "oot" / "fonts" / "visitor1.ttf"
+CELL_SIZE = 40
+ITEM_SIZE = 32
+REWARD_NAMES = ["????", "FREE", "DEKU", "DC", "JABU", "FOREST", "FIRE", "WATER", "SHADOW", "SPIRIT"]
+
+
+def save_image(path: Path, size: tuple[int, int], color: tuple[int, int, int, int]):
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        Image.new("RGBA", size, color).save(path)
+
+    return path
+
+
+def get_color(index: int):
+    # distinct enough colors, the images are only placeholders
+    return ((index * 67) % 256, (index * 131) % 256, (index * 197) % 256, 255)
+
+
+def generate_config(
+    folder: Path,
+    inventories: int = 1,
+    items: int = 100,
+    positions: int = 1,
+    sources: int = 1,
+    counters: int = 0,
+    flags: int = 0,
+    rewards: int = 0,
+    extras: int = 0,
+    unique_images: bool = False,
+    seed: int = 0,
+):
+    """
+    Writes ``config.xml`` and its images in ``folder``, returns the path to the config.
+    Counters, flags, rewards and extra images are each given to a different set of items.
+    """
+
+    if counters + flags + rewards + extras > items:
+        raise ValueError("there's more counters, flags, rewards and extras than items")
+
+    folder.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed)
+
+    # every item gets at most one of these roles
+    indices = rng.sample(range(items), counters + flags + rewards + extras)
+    counter_items = set(indices[:counters])
+    flag_items = set(indices[counters : counters + flags])
+    reward_items = set(indices[counters + flags : counters + flags + rewards])
+    extra_items = set(indices[counters + flags + rewards :])
+
+    num_labels = items * positions
+    columns = max(1, math.ceil(math.sqrt(num_labels)))
+    rows = math.ceil(num_labels / columns)
+    width, height = columns * CELL_SIZE, rows * CELL_SIZE
+
+    save_image(folder / "background.png", (width, height), (0, 0, 0, 255))
+    save_image(folder / "icon.png", (ITEM_SIZE, ITEM_SIZE), get_color(0))
+    save_image(folder / "gomode.png", (ITEM_SIZE, ITEM_SIZE), (255, 255, 0, 255))
+    save_image(folder / "light.png", (ITEM_SIZE * 2, ITEM_SIZE * 2), (255, 255, 255, 64))
+    save_image(folder / "check.png", (16, 16), (0, 255, 0, 255))
+    (folder / "fonts").mkdir(exist_ok=True)
+    shutil.copyfile(FONT_PATH, folder / "fonts" / FONT_PATH.name)
+
+    table = ET.Element("Table")
+    config = ET.SubElement(table, "Config", DefaultInventory="0")
+
+    fonts = ET.SubElement(config, "Fonts")
+    ET.SubElement(fonts, "Item", Index="0", Name="Visitor TT1 BRK", Source=f"fonts/{FONT_PATH.name}")
+
+    text_settings = ET.SubElement(config, "TextSettings")
+    for i, name in enumerate(["Counters", "Flags", "Rewards"]):
+        ET.SubElement(
+            text_settings,
+            "Item",
+            Index=str(i),
+            Name=name,
+            FontIndex="0",
+            Size="10",
+            Bold="True",
+            Color="0xFFFFFF",
+            ColorMax="0x00FF00",
+            OutlineThickness="1.8",
+        )
+
+    flags_node = ET.SubElement(config, "Flags")
+    ET.SubElement(flags_node, "Item", Index="0", Pos="0;-3", Width="35", Height="15", Text="A;B;C", TextSettings="1")
+
+    ET.SubElement(config, "GoMode", Pos="0;0", Source="gomode.png", LightPath="light.png", LightPos="0;0")
+
+    extras_node = ET.SubElement(config, "Extras")
+    ET.SubElement(extras_node, "Item", Index="0", Pos="18;-4", Path="check.png")
+
+    for inv_index in range(inventories):
+        inventory = ET.SubElement(
+            config,
+            "Inventory",
+            Index=str(inv_index),
+            Icon="icon.png",
+            Name=f"Generated {inv_index} ({items} items)",
+            Background="background.png",
+            BackgroundColor="0x000000",
+        )
+
+        cell = 0
+        for i in range(items):
+            attributes = {"Name": f"Item {i}"}
+
+            if i in counter_items or sources > 1:
+                attributes["UseWheel"] = "True"
+            if i in flag_items:
+                attributes["FlagIndex"] = "0"
+            if i in reward_items:
+                attributes["Reward"] = "True"
+            if i in extra_items:
+                attributes["ExtraIndex"] = "0"
+
+            item = ET.SubElement(inventory, "Item", attributes)
+            sources_node = ET.SubElement(item, "Sources")
+
+            for s in range(sources):
+                name = f"items/item_{i}_{s}.png" if unique_images else f"items/source_{s}.png"
+                save_image(folder / name, (ITEM_SIZE, ITEM_SIZE), get_color(i * sources + s if unique_images else s))
+                ET.SubElement(sources_node, "Item", Path=name)
+
+            positions_node = ET.SubElement(item, "Positions")
+            for _ in range(positions):
+                x, y = (cell % columns) * CELL_SIZE, (cell // columns) * CELL_SIZE
+                ET.SubElement(positions_node, "Item", X=str(x + 4), Y=str(y + 4))
+                cell += 1
+
+            if i in counter_items:
+                ET.SubElement(
+                    item,
+                    "Counter",
+                    TextSettings="0",
+                    Min="0",
+                    Max="50",
+                    Increment="1",
+                    MiddleIncrement="5",
+                    Pos="-6;22",
+                    Width="32",
+                    Height="15",
+                    UseWheel="True",
+                )
+
+        if rewards > 0:
+            rewards_node = ET.SubElement(inventory, "Rewards")
+            for name in REWARD_NAMES:
+                ET.SubElement(rewards_node, "Item", Pos="-6;23", Width="45", Height="32", Name=name, TextSettings="2")
+
+    ET.indent(table, space="    ")
+    path = folder / "config.xml"
+    ET.ElementTree(table).write(path, encoding="UTF-8", xml_declaration=True)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generates a configuration with placeholder images")
+    parser.add_argument("folder", type=Path, help="output folder, the config is written to FOLDER/config.xml")
+    parser.add_argument("--inventories", type=int, default=1, help="number of inventories")
+    parser.add_argument("--items", type=int, default=100, help="number of items per inventory")
+    parser.add_argument("--positions", type=int, default=1, help="number of positions per item")
+    parser.add_argument("--sources", type=int, default=1, help="number of sources (images) per item")
+    parser.add_argument("--counters", type=int, default=0, help="number of items with a counter")
+    parser.add_argument("--flags", type=int, default=0, help="number of items with a flag")
+    parser.add_argument("--rewards", type=int, default=0, help="number of reward items")
+    parser.add_argument("--extras", type=int, default=0, help="number of items with an extra image")
+    parser.add_argument("--unique-images", action="store_true", help="use different image files for every item")
+    parser.add_argument("--seed", type=int, default=0, help="seed used to pick the items of each kind")
+    args = parser.parse_args()
+
+    path = generate_config(
+        args.folder.resolve(),
+        args.inventories,
+        args.items,
+        args.positions,
+        args.sources,
+        args.counters,
+        args.flags,
+        args.rewards,
+        args.extras,
+        args.unique_images,
+        args.seed,
+    )
+
+    print(f"INFO: generated '{path}' ({args.inventories} x {args.items * args.positions} labels)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import os
+import sys
+import json
+import argparse
+
+from dataclasses import asdict
+from pathlib import Path
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT_DIR / "src"))
+
+from PyQt6.QtWidgets import QApplication, QWidget
+
+from config import Config
+from tracker import TrackerWindow
+from diagnostics import MemoryAccounting, get_memory_report
+
+# prints where the memory of a tracker goes (pixmaps, graphics effects, widgets, fonts)
+# usage: python tools/memory_report.py config/oot/config.xml --top 20 [--json]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reports the memory used by a configuration's tracker")
+    parser.add_argument("configs", type=Path, nargs="+", help="paths to the configurations")
+    parser.add_argument("--top", type=int, default=20, help="number of pixmaps in the list of the largest ones")
+    parser.add_argument("--json", action="store_true", help="print the raw numbers as JSON")
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)
+    widget = QWidget()
+    results = []
+
+    for path in args.configs:
+        config = Config(widget, path.resolve())
+        window = TrackerWindow(None, config)
+        window.show()
+        app.processEvents()
+
+        if args.json:
+            usage = MemoryAccounting(config, window).get_usage()
+            results.append(
+                {
+                    "config": str(path),
+                    "totals": usage.get_totals(),
+                    "pixmaps": [asdict(entry) for entry in usage.pixmaps],
+                    "effects": usage.effects,
+                    "active_effects": usage.active_effects,
+                    "effect_buffers": usage.effect_buffers,
+                    "widgets": dict(usage.widgets),
+                    "fonts": usage.fonts,
+                    "font_registrations": usage.font_registrations,
+                }
+            )
+        else:
+            print(get_memory_report(config, window, args.top))
+            print()
+
+        config.state_saved = True
+        window.close()
+
+    if args.json:
+        print(json.dumps(results, indent=4))
+
+    app.quit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import os
+import sys
+import argparse
+
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT_DIR / "src"))
+
+from PyQt6.QtWidgets import QApplication, QWidget
+
+from config import Config
+from state import State
+from tracker import TrackerWindow
+from recording import Recording, SessionPlayer
+
+# replays a recorded session into a tracker, hidden by default (offscreen),
+# as fast as possible to measure the throughput or at the recorded speed (multiplied by --speed)
+# usage: python tools/replay.py config/oot/config.xml session.jsonl --speed 0 --output state.json
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replays a recorded session")
+    parser.add_argument("config", type=Path, help="path to the configuration the session was recorded with")
+    parser.add_argument("recording", type=Path, help="path to the recording")
+    parser.add_argument("--speed", type=float, default=0.0, help="speed multiplier, 0 replays as fast as possible")
+    parser.add_argument("--show", action="store_true", help="show the tracker window while replaying")
+    parser.add_argument("--output", type=Path, help="optional, saves the final state to this path")
+    args = parser.parse_args()
+
+    if not args.show:
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+    app = QApplication(sys.argv)
+    widget = QWidget()
+    config = Config(widget, args.config.resolve())
+    recording = Recording(args.recording.resolve())
+
+    if not recording.is_compatible(config):
+        print("ERROR: this recording was made with a different configuration")
+        sys.exit(1)
+
+    window = TrackerWindow(None, config)
+
+    if args.show:
+        window.show()
+
+    player = SessionPlayer(window, recording, args.speed)
+
+    if args.speed > 0:
+        player.finished.connect(app.quit)
+        player.start_playback()
+        app.exec()
+        print(f"{len(recording.actions)} actions replayed ({recording.get_duration() / args.speed:.1f} s)")
+    else:
+        actions_per_second, mean_latency = player.run_fast()
+        print(f"{len(recording.actions)} actions, {actions_per_second:.0f} actions/s, {mean_latency:.3f} ms/action")
+
+    if args.output is not None:
+        state = State(config, args.output.resolve())
+        state.get_states_from_labels()
+        state.write()
+
+    # nothing to save when closing the window
+    config.state_saved = True
+    window.close()
+    app.quit()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,85 +1,228 @@
-from PyQt6.QtCore import *
-from PyQt6.QtGui import *
-from PyQt6.QtWidgets import *
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
 
+from pathlib import Path
+from types import SimpleNamespace
 
-# to test rotating stuff easily
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT_DIR / "src"))
+
+from PyQt6.QtCore import Qt, QSize, QObject, QTimer, QElapsedTimer, pyqtSignal
+from PyQt6.QtGui import QPixmap
+from PyQt6.QtWidgets import QApplication, QMainWindow
+
+from common import Rotation, RotationWidget
+
+# to test rotating stuff easily, uses the tracker's Rotation and RotationWidget
 # from https://stackoverflow.com/a/74249310
-# to change the speed you can edit thread_refresh and the speed value from the Rotation instanciation
-# to change the image you can edit the path inside RotationWidget's init function
+# visual check: python tools/rotation_test.py --speed -85 --refresh 0.001
+# benchmark (offscreen): python tools/rotation_test.py --benchmark --duration 2 --output rotation.json
+# the benchmark runs every combination of --speeds, --refreshes and --sizes for every implementation
+
+
+LIGHT_PATH = ROOT_DIR / "config" / "oot" / "light.png"
+DISPLAY_REFRESH = 1 / 60
 
 
-class RotationWidget(QWidget):
-    position = rotation = 0
+class TimerRotation(QObject):
+    """
+    Alternative to ``Rotation``: a timer on the GUI thread, the position is computed from the elapsed time
+    so the speed doesn't depend on the timer's accuracy, and there's no signal crossing threads
+    """
 
-    def __init__(self, image="config/oot/light.png"):
+    positionChanged = pyqtSignal(object)
+
+    def __init__(self, config, position: int = 0):
         super().__init__()
-        self.image = QPixmap(image)
-        self.setFixedSize(self.image.size())
-        self.transform = QTransform()
-        half = self.image.size() / 2
-        self.tX = half.width()
-        self.tY = half.height()
-
-    def setPosition(self, pos):
-        if self.position != pos:
-            self.rotation = pos - self.position
-        else:
-            self.rotation = 0
-        self.position = pos
-        self.update()
+        self.position = position
+        self.start_position = position
+        self.speed = config.gomode_settings.rotation_speed
+        self.thread_refresh = config.gomode_settings.thread_refresh_rate
+        self.elapsed = QElapsedTimer()
+        self.timer = QTimer(self)
+        self.timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.timer.timeout.connect(self.timer_timeout)
+
+    def start(self):
+        self.elapsed.start()
+        self.timer.start(max(1, int(self.thread_refresh * 1000)))
+
+    def stop(self):
+        self.timer.stop()
+
+    def timer_timeout(self):
+        position = round((self.start_position + self.elapsed.elapsed() / 1000 * self.speed) % 360, 2)
+
+        if position != self.position:
+            self.position = position
+            self.positionChanged.emit(self.position)
+
+
+class MeasuredRotationWidget(RotationWidget):
+    def __init__(self, image: str):
+        super().__init__(image)
+        self.paint_times: list[float] = []
+        self.frame_times: list[float] = []
 
     def paintEvent(self, event):
-        qp = QPainter(self)
-        qp.setRenderHint(QPainter.RenderHint.Antialiasing)
-        qp.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
-        self.transform.translate(self.tX, self.tY)
-        self.transform.rotate(self.rotation)
-        self.transform.translate(-self.tX, -self.tY)
-        qp.setTransform(self.transform)
-        qp.drawPixmap(0, 0, self.image)
-        qp.end()
+        start = time.perf_counter()
+        super().paintEvent(event)
+        end = time.perf_counter()
+        self.paint_times.append(end - start)
+        self.frame_times.append(end)
 
 
 class MainWindow(QMainWindow):
-    def __init__(self):
+    def __init__(self, image: str):
         super().__init__()
 
-        self.setFixedSize(QSize(500, 500))
+        self.signals = 0
         self.setStyleSheet("background-color: black")
-        self.rotationWidget = RotationWidget()
+        self.rotationWidget = MeasuredRotationWidget(image)
+        self.setFixedSize(self.rotationWidget.size().expandedTo(QSize(500, 500)))
         self.setCentralWidget(self.rotationWidget)
 
     def positionChanged(self, pos):
+        self.signals += 1
         self.rotationWidget.setPosition(pos)
 
 
-class Rotation(QThread):
-    positionChanged = pyqtSignal(object)
-    delta_angle = 1
-    thread_refresh = 0.001
+IMPLEMENTATIONS = {"thread": Rotation, "timer": TimerRotation}
 
-    def __init__(self, position, speed):
-        super().__init__()
-        self.position = position
-        self.speed = speed
 
-    def run(self):
-        while True:
-            diff = self.thread_refresh * self.speed
-            self.position = round((self.position + diff) % 360, 2)
-            self.positionChanged.emit(self.position)
-            self.msleep(int(self.thread_refresh * 1000))
+def create_rotation(implementation: str, speed: int, refresh: float):
+    # the rotation only needs the go mode settings of the config
+    config = SimpleNamespace(gomode_settings=SimpleNamespace(rotation_speed=speed, thread_refresh_rate=refresh))
+    return IMPLEMENTATIONS[implementation](config)
 
 
-if __name__ == "__main__":
-    import sys
+def stop_rotation(rotation: QObject):
+    if isinstance(rotation, Rotation):
+        rotation.requestInterruption()
+        rotation.wait()
+    else:
+        rotation.stop()
 
-    app = QApplication(sys.argv)
-    window = MainWindow()
-    item = Rotation(0, -85)
-    item.positionChanged.connect(window.positionChanged)
 
+def get_image(folder: Path, size: int):
+    path = folder / f"light_{size}.png"
+
+    if not path.exists():
+        pixmap = QPixmap(str(LIGHT_PATH)).scaled(size, size, transformMode=Qt.TransformationMode.SmoothTransformation)
+        pixmap.save(str(path))
+
+    return str(path)
+
+
+def run(app: QApplication, implementation: str, speed: int, refresh: float, image: str, duration: float):
+    window = MainWindow(image)
     window.show()
-    item.start()
+    app.processEvents()
+
+    widget = window.rotationWidget
+    widget.paint_times.clear()
+    widget.frame_times.clear()
+
+    rotation = create_rotation(implementation, speed, refresh)
+    rotation.positionChanged.connect(window.positionChanged)
+
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    rotation.start()
+
+    # a real event loop, spinning on processEvents would use a whole core
+    QTimer.singleShot(int(duration * 1000), app.quit)
     app.exec()
+
+    stop_rotation(rotation)
+    wall_time = time.perf_counter() - start
+    cpu_time = time.process_time() - cpu_start
+    app.processEvents()
+    window.close()
+
+    # a frame is dropped when the gap between two frames misses a refresh of the display (or of the animation)
+    interval = max(DISPLAY_REFRESH, refresh)
+    frame_times = [start] + widget.frame_times
+    dropped = sum(max(0, int((b - a) / interval) - 1) for a, b in zip(frame_times, frame_times[1:]))
+    paint_times = sorted(t * 1000 for t in widget.paint_times) or [0.0]
+
+    return {
+        "implementation": implementation,
+        "speed": speed,
+        "refresh": refresh,
+        "size": widget.image.width(),
+        "frames": len(widget.paint_times),
+        "fps": round(len(widget.paint_times) / wall_time, 2),
+        "dropped_frames": dropped,
+        "paint_mean_ms": round(statistics.fmean(paint_times), 4),
+        "paint_p95_ms": round(paint_times[min(len(paint_times) - 1, int(len(paint_times) * 0.95))], 4),
+        "signals_per_second": round(window.signals / wall_time, 2),
+        "cpu_percent": round(cpu_time / wall_time * 100, 2),
+    }
+
+
+def benchmark(app: QApplication, args: argparse.Namespace):
+    results = []
+    print(
+        f"{'impl':<8}{'speed':>7}{'refresh':>9}{'size':>6}{'frames':>8}{'fps':>8}{'dropped':>9}"
+        + f"{'paint (ms)':>12}{'signals/s':>11}{'cpu %':>8}"
+    )
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for implementation in args.implementations:
+            for size in args.sizes:
+                image = get_image(Path(temp_dir), size)
+
+                for speed in args.speeds:
+                    for refresh in args.refreshes:
+                        r = run(app, implementation, speed, refresh, image, args.duration)
+                        results.append(r)
+                        print(
+                            f"{r['implementation']:<8}{r['speed']:>7}{r['refresh']:>9}{r['size']:>6}{r['frames']:>8}"
+                            + f"{r['fps']:>8}{r['dropped_frames']:>9}{r['paint_mean_ms']:>12}"
+                            + f"{r['signals_per_second']:>11}{r['cpu_percent']:>8}"
+                        )
+
+    if args.output is not None:
+        args.output.write_text(json.dumps(results, indent=4) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shows or benchmarks the go mode's light rotation")
+    parser.add_argument("--implementation", choices=IMPLEMENTATIONS.keys(), default="thread")
+    parser.add_argument("--speed", type=int, default=-85, help="rotation speed (LightRotSpeed)")
+    parser.add_argument("--refresh", type=float, default=0.001, help="refresh rate in seconds (LightRotRefresh)")
+    parser.add_argument("--benchmark", action="store_true", help="measure every combination offscreen")
+    parser.add_argument("--implementations", nargs="+", choices=IMPLEMENTATIONS.keys(), default=["thread", "timer"])
+    parser.add_argument("--speeds", type=int, nargs="+", default=[-30, -70, -150])
+    parser.add_argument("--refreshes", type=float, nargs="+", default=[0.001, 0.004, 0.016])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[64, 256, 512])
+    parser.add_argument("--duration", type=float, default=2.0, help="duration of each benchmark run in seconds")
+    parser.add_argument("--output", type=Path, help="optional, writes the benchmark results as JSON to this path")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+    app = QApplication(sys.argv)
+
+    if args.benchmark:
+        benchmark(app, args)
+    else:
+        window = MainWindow(str(LIGHT_PATH))
+        rotation = create_rotation(args.implementation, args.speed, args.refresh)
+        rotation.positionChanged.connect(window.positionChanged)
+
+        window.show()
+        rotation.start()
+        app.exec()
+        stop_rotation(rotation)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+from pathlib import Path
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT_DIR / "src"))
+
+from PyQt6.QtWidgets import QApplication, QWidget
+
+from config import Config
+from state import State, LabelState
+from generate_config import generate_config
+
+# compares the load and save time of the text and the json state formats
+# usage: python tools/state_benchmark.py --items 1000 --positions 4 --repeat 10
+
+
+def get_random_states(config: Config):
+    states: list[LabelState] = []
+
+    for item in config.active_inv.items:
+        for i, _ in enumerate(item.positions):
+            states.append(
+                LabelState(
+                    item.index,
+                    i,
+                    item.name,
+                    random.randint(-1, 3),
+                    random.randint(0, 50),
+                    random.choice([True, False]),
+                    random.choice([True, False]),
+                    random.randint(0, 9),
+                    None,
+                    random.randint(0, 3),
+                    random.choice([True, False]),
+                    random.choice([True, False]),
+                )
+            )
+
+    return states
+
+
+def run(config: Config, path: Path, states: list[LabelState], repeat: int):
+    save_time = load_time = 0.0
+
+    for _ in range(repeat):
+        state = State(config, path)
+        state.states = states
+
+        start = time.perf_counter()
+        state.write()
+        save_time += time.perf_counter() - start
+
+        state = State(config, path)
+        start = time.perf_counter()
+        state.read()
+        load_time += time.perf_counter() - start
+
+        if state.states != states:
+            print(f"ERROR: the states read from '{path.name}' don't match the saved states")
+
+    return save_time / repeat * 1000, load_time / repeat * 1000, path.stat().st_size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks the state formats")
+    parser.add_argument("--items", type=int, default=1000, help="number of inventory items")
+    parser.add_argument("--positions", type=int, default=4, help="number of positions per item")
+    parser.add_argument("--repeat", type=int, default=10, help="number of iterations per format")
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)
+    widget = QWidget()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        folder = Path(temp_dir)
+        config = Config(widget, generate_config(folder, items=args.items, positions=args.positions))
+        states = get_random_states(config)
+
+        print(f"{len(states)} labels, {args.repeat} iterations")
+        print(f"{'format':<8}{'save (ms)':>12}{'load (ms)':>12}{'size (KiB)':>12}")
+
+        for suffix in [".txt", ".json"]:
+            save_time, load_time, size = run(config, folder / f"state{suffix}", states, args.repeat)
+            print(f"{suffix:<8}{save_time:>12.2f}{load_time:>12.2f}{size / 1024:>12.1f}")
+
+    app.quit()
+
+
+if __name__ == "__main__":
+    main()